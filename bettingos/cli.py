@@ -2,13 +2,23 @@ from __future__ import annotations
 import argparse
 import sys
 import time
+from bisect import bisect_right
 from dataclasses import asdict
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
+from itertools import groupby
+from operator import itemgetter
+
+import numpy as np
 
 from .config import SETTINGS
-from .db.mongo import ensure_indices, get_db
-from .ev.calc import de_vig_three_way, ev_decimal
-from .ev.arbit import is_three_way_arb, is_two_way_arb
+from .db.init_indices import (
+    BOOK_CAPTURED_IDX,
+    EVENT_MARKET_CAPTURED_IDX,
+    LATEST_QUOTES_IDX,
+)
+from .db.mongo import ensure_indices, get_db, quotes_is_timeseries
+from .logging_conf import configure_logging
+from .ev.calc import de_vig_batch, de_vig_three_way, ev_decimal
 
 # Spiders (keep as-is if you have them)
 from .spiders.proto import bovada_proto
@@ -18,10 +28,6 @@ from .spiders.proto import cloudbet_proto  # if not present, remove this line
 from .harvest.playwright_harvester import run_once as harvest_run_once
 
 
-def _as_aware(dt):
-    return dt if getattr(dt, "tzinfo", None) else dt.replace(tzinfo=timezone.utc)
-
-
 def cmd_init_db(args):
     ensure_indices()
     print("Indices ensured.")
@@ -48,29 +54,69 @@ def cmd_scheduler(args):
     scheduler_main()
 
 
+# Only the fields the EV loops read; keeps the $group working set small.
+_QUOTE_FIELDS = {
+    "selection": "$selection",
+    "odds_decimal": "$odds_decimal",
+    "bookmaker": "$bookmaker",
+    "captured_at_utc": "$captured_at_utc",
+    "market_uid": "$market_uid",
+}
+
+
+_QUOTE_PROJECTION = {**dict.fromkeys(_QUOTE_FIELDS, 1), "event_key": 1, "_id": 0}
+
+# Selection -> bit, so market completeness is one int compare per event
+_BIT = {"home": 1, "draw": 2, "away": 4}
+_THREE_WAY = 0b111
+_TWO_WAY = 0b101
+
+
+def _quotes_hint(index: str) -> str | None:
+    """The named index as a hint on a regular quotes collection; None on time-series."""
+    return None if quotes_is_timeseries() else index
+
+
+def _recent_quotes_match(now: datetime) -> dict:
+    """Restrict EV scans to quotes young enough to act on (4x the staleness budget)."""
+    return {
+        "market_uid": {"$in": ["FT_1X2", "FT_ML_2W"]},
+        "captured_at_utc": {"$gte": now - timedelta(seconds=SETTINGS.stale_s * 4)},
+    }
+
+
 def _ev_scan_print(ev_threshold: float) -> None:
     db = get_db()
     coll = db.get_collection("quotes_snapshots")
 
     pipeline = [
-        {"$match": {"market_uid": {"$in": ["FT_1X2", "FT_ML_2W"]}}},
-        {"$sort": {"captured_at_utc": -1}},
-        {"$group": {"_id": {"event": "$event_key", "selection": "$selection"}, "doc": {"$first": "$$ROOT"}}},
+        {"$match": _recent_quotes_match(datetime.now(timezone.utc))},
+        # $top picks the newest quote per (event, selection) inside the group,
+        # so no blocking global $sort is needed first
+        {"$group": {
+            "_id": {"event": "$event_key", "selection": "$selection"},
+            "doc": {"$top": {"sortBy": {"captured_at_utc": -1}, "output": _QUOTE_FIELDS}},
+        }},
         {"$group": {"_id": "$_id.event", "rows": {"$push": "$doc"}}},
     ]
 
-    for row in coll.aggregate(pipeline):
-        rows = row["rows"]
-        labels = {r["selection"] for r in rows}
-        if {"home", "draw", "away"}.issubset(labels):
-            od = {r["selection"]: r["odds_decimal"] for r in rows if r["selection"] in {"home", "draw", "away"}}
+    hint = _quotes_hint(LATEST_QUOTES_IDX)
+    for row in coll.aggregate(pipeline, **({"hint": hint} if hint else {})):
+        mask = 0
+        od: dict[str, float] = {}
+        for r in row["rows"]:
+            sel = r["selection"]
+            b = _BIT.get(sel, 0)
+            if b:
+                mask |= b
+                od[sel] = r["odds_decimal"]
+        if mask == _THREE_WAY:
             probs = de_vig_three_way([od["home"], od["draw"], od["away"]])
             for sel, p in zip(["home", "draw", "away"], probs):
                 ev = ev_decimal(p, od[sel])
                 if ev >= ev_threshold:
                     print(f"EV hit: event={row['_id']} sel={sel} odds={od[sel]:.2f} EV={ev*100:.2f}%")
-        elif {"home", "away"}.issubset(labels):
-            od = {r["selection"]: r["odds_decimal"] for r in rows if r["selection"] in {"home", "away"}}
+        elif mask & _TWO_WAY == _TWO_WAY:
             inv = [1.0 / od["home"], 1.0 / od["away"]]
             s = sum(inv)
             probs = [x / s for x in inv]
@@ -89,61 +135,86 @@ def cmd_ev_scan_xbook(args):
     coll = db.get_collection("quotes_snapshots")
     ev_coll = db.get_collection("ev_hits")
 
-    pipeline = [
-        {"$match": {"market_uid": {"$in": ["FT_1X2", "FT_ML_2W"]}}},
-        {"$sort": {"odds_decimal": -1, "captured_at_utc": -1}},
-        {"$group": {"_id": {"event": "$event_key", "selection": "$selection"}, "doc": {"$first": "$$ROOT"}}},
-        {"$group": {"_id": "$_id.event", "rows": {"$push": "$doc"}}},
-    ]
-
-    hits = 0
     now = datetime.now(timezone.utc)
-    for row in coll.aggregate(pipeline):
-        rows = row["rows"]
-        by_sel = {r["selection"]: r for r in rows}
-
-        if all(k in by_sel for k in ("home", "draw", "away")):
-            prices = [by_sel["home"]["odds_decimal"], by_sel["draw"]["odds_decimal"], by_sel["away"]["odds_decimal"]]
-            probs = de_vig_three_way(prices)
-            if is_three_way_arb(prices):
-                print(f"ARB (3-way): event={row['_id']} prices={prices}")
-            loop = [("home", probs[0]), ("draw", probs[1]), ("away", probs[2])]
-        elif all(k in by_sel for k in ("home", "away")):
-            h, a = by_sel["home"]["odds_decimal"], by_sel["away"]["odds_decimal"]
-            inv = [1.0 / h, 1.0 / a]
-            s = sum(inv)
-            probs = [x / s for x in inv]
-            if is_two_way_arb(h, a):
-                print(f"ARB (2-way): event={row['_id']} prices={[h, a]}")
-            loop = [("home", probs[0]), ("away", probs[1])]
-        else:
+    # Sorted (event, selection, newest first) and grouped client-side, so one
+    # event is in memory at a time; groupby relies on the explicit sort. A regular
+    # collection streams this order from LATEST_QUOTES_IDX. A time-series one only
+    # indexes buckets, so the server sorts in memory, spilling to disk when large.
+    cursor = (
+        coll.find(_recent_quotes_match(now), _QUOTE_PROJECTION)
+        .sort([("event_key", 1), ("selection", 1), ("captured_at_utc", -1)])
+        .allow_disk_use(True)
+    )
+    hint = _quotes_hint(LATEST_QUOTES_IDX)
+    if hint:
+        cursor = cursor.hint(hint)
+
+    # Split complete markets by shape, then score each shape as one matrix
+    three_way: list[tuple[str, dict]] = []
+    two_way: list[tuple[str, dict]] = []
+    for event_key, rows in groupby(cursor, key=itemgetter("event_key")):
+        mask = 0
+        by_sel: dict[str, dict] = {}
+        for r in rows:
+            sel = r["selection"]
+            b = _BIT.get(sel, 0)
+            if not b:
+                continue
+            mask |= b
+            # best price across books; ties keep the newest (seen first)
+            best = by_sel.get(sel)
+            if best is None or r["odds_decimal"] > best["odds_decimal"]:
+                by_sel[sel] = r
+        if mask == _THREE_WAY:
+            three_way.append((event_key, by_sel))
+        elif mask & _TWO_WAY == _TWO_WAY:
+            two_way.append((event_key, by_sel))
+
+    # Datetimes from get_client() are always UTC-aware, so plain float math is safe
+    now_ts = now.timestamp()
+    pending: list[dict] = []
+    for labels, group in ((("home", "draw", "away"), three_way), (("home", "away"), two_way)):
+        if not group:
             continue
+        odds = np.array([[by_sel[k]["odds_decimal"] for k in labels] for _, by_sel in group], dtype=float)
+        probs, overround = de_vig_batch(odds)
+        ev = ev_decimal(probs, odds)
 
-        for sel, p in loop:
+        for i in np.flatnonzero(overround < 1.0):
+            print(f"ARB ({len(labels)}-way): event={group[i][0]} prices={odds[i].tolist()}")
+
+        for i, j in zip(*np.nonzero(ev >= args.edge)):
+            event_key, by_sel = group[i]
+            sel = labels[j]
             best = by_sel[sel]
-            ev = ev_decimal(p, best["odds_decimal"])
-            age_s = max(0.0, (now - _as_aware(best["captured_at_utc"])).total_seconds())
-            if ev >= args.edge:
-                doc = {
-                    "event_key": row["_id"],
-                    "market_uid": best.get("market_uid", "FT_1X2"),
-                    "selection": sel,
-                    "bookmaker": best["bookmaker"],
-                    "odds": best["odds_decimal"],
-                    "edge": ev,
-                    "p_star": p,
-                    "captured_at_utc": best["captured_at_utc"],
-                    "age_s": age_s,
-                    "computed_at_utc": now,
-                }
-                ev_coll.insert_one(doc)
-                print(
-                    f"EV+ : event={row['_id']} sel={sel} {best['bookmaker']}@{best['odds_decimal']:.2f} "
-                    f"EV={ev*100:.2f}% age={age_s:.0f}s"
-                )
-                hits += 1
-
-    print(f"Total EV hits stored: {hits}")
+            p, edge = float(probs[i, j]), float(ev[i, j])
+            age_s = max(0.0, now_ts - best["captured_at_utc"].timestamp())
+            doc = {
+                "event_key": event_key,
+                "market_uid": best.get("market_uid", "FT_1X2"),
+                "selection": sel,
+                "bookmaker": best["bookmaker"],
+                "odds": best["odds_decimal"],
+                "edge": edge,
+                "p_star": p,
+                "captured_at_utc": best["captured_at_utc"],
+                "age_s": age_s,
+                "computed_at_utc": now,
+            }
+            pending.append(doc)
+            print(
+                f"EV+ : event={event_key} sel={sel} {best['bookmaker']}@{best['odds_decimal']:.2f} "
+                f"EV={edge*100:.2f}% age={age_s:.0f}s"
+            )
+
+    # One round-trip for the whole scan instead of one per hit
+    if pending:
+        ev_coll.insert_many(pending, ordered=False)
+    print(f"Total EV hits stored: {len(pending)}")
+
+
+_AGE_BOUNDS_MS = (60_000, 300_000, 1_800_000, 7_200_000)
+_AGE_LABELS = ("0-60s", "1-5m", "5-30m", "30m-2h", ">2h")
 
 
 def cmd_metrics_odds_age(args):
@@ -152,22 +223,32 @@ def cmd_metrics_odds_age(args):
     now = datetime.now(timezone.utc)
 
     match = {}
+    opts = {}
     if args.book:
         match["bookmaker"] = args.book
-
-    buckets = {"0-60s": 0, "1-5m": 0, "5-30m": 0, "30m-2h": 0, ">2h": 0}
-    for doc in coll.find(match, {"captured_at_utc": 1}).limit(50000):
-        age = (now - _as_aware(doc["captured_at_utc"])).total_seconds()
-        if age <= 60:
-            buckets["0-60s"] += 1
-        elif age <= 300:
-            buckets["1-5m"] += 1
-        elif age <= 1800:
-            buckets["5-30m"] += 1
-        elif age <= 7200:
-            buckets["30m-2h"] += 1
-        else:
-            buckets[">2h"] += 1
+        hint = _quotes_hint(BOOK_CAPTURED_IDX)
+        if hint:
+            opts["hint"] = hint
+
+    # Bucket on the server so only the counts come back. Ages are in ms and
+    # clamped at 0 (clock skew lands in the first bucket). $bucket upper bounds
+    # are exclusive, hence +1 to keep "age <= 60s" style edges; ">2h" reports
+    # under the last boundary as its default.
+    age_ms = {"$max": [0, {"$subtract": [now, "$captured_at_utc"]}]}
+    boundaries = [0, *(b + 1 for b in _AGE_BOUNDS_MS)]
+    pipeline = [
+        {"$match": match},
+        {"$bucket": {
+            "groupBy": age_ms,
+            "boundaries": boundaries,
+            "default": boundaries[-1],
+            "output": {"count": {"$sum": 1}},
+        }},
+    ]
+    counts = [0] * len(_AGE_LABELS)
+    for b in coll.aggregate(pipeline, **opts):
+        counts[bisect_right(_AGE_BOUNDS_MS, b["_id"])] += b["count"]
+    buckets = dict(zip(_AGE_LABELS, counts))
     print("Odds age histogram:", buckets)
 
 
@@ -204,6 +285,23 @@ def cmd_pulse(args):
     print(f"[pulse] done runs={runs}")
 
 
+_TAIL_FIELDS = (
+    "bookmaker", "event_key", "market_uid", "selection",
+    "odds_decimal", "param", "captured_at_utc", "source_url",
+)
+_TAIL_PROJECTION = {**dict.fromkeys(_TAIL_FIELDS, 1), "_id": 0}
+
+
+def _tail_hint(q: dict) -> str | None:
+    """Pick the index whose prefix matches the filter and ends in captured_at_utc."""
+    if q.keys() == {"bookmaker"}:
+        return _quotes_hint(BOOK_CAPTURED_IDX)
+    if q.keys() == {"event_key", "market_uid"}:
+        return _quotes_hint(EVENT_MARKET_CAPTURED_IDX)
+    # (bookmaker, market_uid) and event-only filters already have an exact index
+    return None
+
+
 def cmd_tail(args):
     """Print the most recent N snapshots (optionally filter by book/event/market)."""
     db = get_db()
@@ -215,20 +313,12 @@ def cmd_tail(args):
         q["event_key"] = args.event
     if args.market:
         q["market_uid"] = args.market
-    cur = coll.find(q).sort("captured_at_utc", -1).limit(args.limit)
+    cur = coll.find(q, _TAIL_PROJECTION).sort("captured_at_utc", -1).limit(args.limit)
+    hint = _tail_hint(q)
+    if hint:
+        cur = cur.hint(hint)
     for d in cur:
-        print(
-            {
-                "bookmaker": d.get("bookmaker"),
-                "event_key": d.get("event_key"),
-                "market_uid": d.get("market_uid"),
-                "selection": d.get("selection"),
-                "odds_decimal": d.get("odds_decimal"),
-                "param": d.get("param"),
-                "captured_at_utc": d.get("captured_at_utc"),
-                "source_url": d.get("source_url"),
-            }
-        )
+        print({k: d.get(k) for k in _TAIL_FIELDS})
 
 
 def cmd_settings(args):
@@ -236,6 +326,7 @@ def cmd_settings(args):
 
 
 def main(argv=None):
+    configure_logging()
     p = argparse.ArgumentParser(prog="bettingos")
     sub = p.add_subparsers(dest="cmd")
 
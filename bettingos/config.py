@@ -9,8 +9,12 @@ load_dotenv()
 class Settings:
     mongo_uri: str = os.getenv("MONGO_URI", "mongodb://localhost:27017")
     mongo_db: str = os.getenv("MONGO_DB", "bettingos")
+    mongo_compressors: str = os.getenv("MONGO_COMPRESSORS", "zstd,zlib")
+    mongo_max_pool: int = int(os.getenv("MONGO_MAX_POOL", "32"))
+    mongo_min_pool: int = int(os.getenv("MONGO_MIN_POOL", "4"))
     user_agent: str = os.getenv("USER_AGENT", "BettingOS/0.1")
     kill_file: str = os.getenv("KILL_SWITCH_FILE", ".kill")
+    log_level: str = os.getenv("LOG_LEVEL", "INFO")
     # Tunables
     quotes_ttl_days: int = int(os.getenv("QUOTES_TTL_DAYS", "14"))
     ev_hits_ttl_days: int = int(os.getenv("EV_HITS_TTL_DAYS", "14"))
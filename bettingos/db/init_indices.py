@@ -2,15 +2,63 @@ from __future__ import annotations
 import os
 from pymongo.database import Database
 
-def ensure_indices(db: Database) -> None:
-    coll = db.get_collection("quotes_snapshots")
+# Named so query paths can pass them to Mongo as hints.
+LATEST_QUOTES_IDX = "market_event_selection_captured"
+BOOK_CAPTURED_IDX = "bookmaker_captured"
+EVENT_MARKET_CAPTURED_IDX = "event_market_captured"
+
+QUOTES_COLL = "quotes_snapshots"
+# Copied into the time-series metaField so buckets group per quoted selection
+QUOTES_META_FIELDS = ("bookmaker", "event_key", "market_uid", "selection")
+
+def _ensure_quotes_timeseries(db: Database, ttl_s: int) -> bool:
+    """Create quotes_snapshots as a time-series collection; True if it is one."""
+    info = next(db.list_collections(filter={"name": QUOTES_COLL}), None)
+    if info is None:
+        db.create_collection(
+            QUOTES_COLL,
+            timeseries={
+                "timeField": "captured_at_utc",
+                "metaField": "meta",
+                "granularity": "seconds",
+            },
+            expireAfterSeconds=ttl_s,
+        )
+        return True
+    if info.get("type") == "timeseries":
+        db.command("collMod", QUOTES_COLL, expireAfterSeconds=ttl_s)
+        return True
+    # Pre-existing regular collection: leave it be (migrate by re-creating)
+    return False
+
+def ensure_indices(db: Database) -> bool:
+    """Create collections/indexes; returns whether quotes_snapshots is time-series."""
+    ttl_days = int(os.getenv("QUOTES_TTL_DAYS", "14"))
+    is_ts = _ensure_quotes_timeseries(db, ttl_days*24*3600)
+    coll = db.get_collection(QUOTES_COLL)
+    # On a regular collection these give per-document order for the hinted scans
+    # in cli.py; on time-series they only narrow buckets, so cli skips the hints
+    # there and relies on explicit sorts (see mongo.quotes_is_timeseries)
     coll.create_index([("bookmaker", 1), ("market_uid", 1), ("captured_at_utc", -1)])
+    coll.create_index([("bookmaker", 1), ("captured_at_utc", -1)], name=BOOK_CAPTURED_IDX)
     coll.create_index([("event_key", 1), ("captured_at_utc", -1)])
-    # TTL for snapshots
-    ttl_days = int(os.getenv("QUOTES_TTL_DAYS", "14"))
-    coll.create_index("captured_at_utc", expireAfterSeconds=ttl_days*24*3600, name="ttl_snapshots")
+    coll.create_index(
+        [("event_key", 1), ("market_uid", 1), ("captured_at_utc", -1)],
+        name=EVENT_MARKET_CAPTURED_IDX,
+    )
+    # "latest per (event, selection)" scans walk this in order for ev-scan
+    coll.create_index(
+        [("market_uid", 1), ("event_key", 1), ("selection", 1), ("captured_at_utc", -1)],
+        name=LATEST_QUOTES_IDX,
+    )
+    # TTL for snapshots (time-series collections expire whole buckets natively)
+    if not is_ts:
+        coll.create_index(
+            "captured_at_utc", expireAfterSeconds=ttl_days*24*3600, name="ttl_snapshots"
+        )
 
     ev = db.get_collection("ev_hits")
     ev.create_index([("event_key", 1), ("market_uid", 1), ("selection", 1), ("computed_at_utc", -1)])
     ev_ttl_days = int(os.getenv("EV_HITS_TTL_DAYS", "14"))
     ev.create_index("computed_at_utc", expireAfterSeconds=ev_ttl_days*24*3600, name="ttl_ev_hits")
+    return is_ts
@@ -4,10 +4,15 @@ from pymongo.collection import Collection
 from pymongo.database import Database
 from pymongo.errors import PyMongoError, ServerSelectionTimeoutError
 from datetime import timezone
+from typing import Iterable
 from . import init_indices
 from ..config import SETTINGS
 
 _client: MongoClient | None = None
+# Snapshot docs are small; 1000 per insert_many stays far below the 16MB message cap
+_INSERT_CHUNK = 1000
+# Whether quotes_snapshots is a time-series collection; probed once per process
+_quotes_ts: bool | None = None
 
 def get_client() -> MongoClient:
     global _client
@@ -17,8 +22,18 @@ def get_client() -> MongoClient:
             serverSelectionTimeoutMS=5000,
             connectTimeoutMS=5000,
             socketTimeoutMS=5000,
+            # Every datetime read back is UTC-aware; callers rely on this and
+            # do not re-tag tzinfo.
             tz_aware=True,
             tzinfo=timezone.utc,
+            # Small snapshot docs compress well; pool sized to our actual
+            # concurrency (harvest + ev-scan + pulse) rather than the default 100.
+            compressors=SETTINGS.mongo_compressors,
+            maxPoolSize=SETTINGS.mongo_max_pool,
+            minPoolSize=SETTINGS.mongo_min_pool,
+            retryWrites=True,
+            w=1,
+            uuidRepresentation="standard",
         )
     return _client
 
@@ -27,8 +42,24 @@ def get_db() -> Database:
 
 def quotes_collection() -> Collection:
     db = get_db()
-    # Use a regular collection first; migrate to time-series if needed
-    return db.get_collection("quotes_snapshots")
+    # Time-series when created by ensure_indices(); older deployments may still be regular
+    return db.get_collection(init_indices.QUOTES_COLL)
+
+def quotes_is_timeseries() -> bool:
+    """
+    True when quotes_snapshots is a time-series collection. Its secondary indexes
+    then cover buckets, not documents, so they neither return rows in index order
+    nor make good hints.
+    """
+    global _quotes_ts
+    if _quotes_ts is None:
+        info = next(get_db().list_collections(filter={"name": init_indices.QUOTES_COLL}), None)
+        _quotes_ts = info is not None and info.get("type") == "timeseries"
+    return _quotes_ts
+
+def _with_meta(doc: dict) -> dict:
+    # Copy with the time-series bucket key added; top-level keys stay for readers/indexes
+    return {**doc, "meta": {k: doc.get(k) for k in init_indices.QUOTES_META_FIELDS}}
 
 def ensure_indices() -> None:
     try:
@@ -39,10 +70,29 @@ def ensure_indices() -> None:
             "Cannot connect to MongoDB at MONGO_URI. "
             "Start Mongo first (e.g., `docker compose up -d`) and retry."
         ) from e
-    init_indices.ensure_indices(get_db())
+    global _quotes_ts
+    _quotes_ts = init_indices.ensure_indices(get_db())
 
 def insert_snapshot(doc: dict) -> None:
     try:
-        quotes_collection().insert_one(doc)
+        quotes_collection().insert_one(_with_meta(doc) if quotes_is_timeseries() else doc)
     except PyMongoError as e:
         raise
+
+def insert_snapshots(docs: Iterable[dict]) -> int:
+    """Insert snapshot docs with unordered insert_many calls; returns the number sent."""
+    coll = quotes_collection()
+    # "meta" only matters as a time-series metaField; a regular collection skips it
+    ts = quotes_is_timeseries()
+    sent = 0
+    batch: list[dict] = []
+    for doc in docs:
+        batch.append(_with_meta(doc) if ts else doc)
+        if len(batch) >= _INSERT_CHUNK:
+            coll.insert_many(batch, ordered=False, bypass_document_validation=True)
+            sent += len(batch)
+            batch = []
+    if batch:
+        coll.insert_many(batch, ordered=False, bypass_document_validation=True)
+        sent += len(batch)
+    return sent
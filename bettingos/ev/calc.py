@@ -1,5 +1,14 @@
 from __future__ import annotations
 from typing import Iterable
+import numpy as np
+
+def american_to_decimal(american: float) -> float | None:
+    """+150 -> 2.5, -200 -> 1.5; None for 0 (or NaN), which has no decimal price."""
+    if american > 0:
+        return 1.0 + american / 100.0
+    if american < 0:
+        return 1.0 - 100.0 / american
+    return None
 
 def implied_prob(odds_decimal: float) -> float:
     return 1.0 / odds_decimal
@@ -9,5 +18,12 @@ def de_vig_three_way(odds: Iterable[float]) -> list[float]:
     s = sum(inv)
     return [x/s for x in inv]
 
+def de_vig_batch(odds: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Row-wise de-vig of an (events, outcomes) odds matrix -> (probs, overround per row)."""
+    inv = 1.0 / odds
+    s = inv.sum(axis=1, keepdims=True)
+    return inv / s, s[:, 0]
+
 def ev_decimal(p_true: float, odds_decimal: float) -> float:
+    # Plain arithmetic, so it also broadcasts over NumPy arrays
     return p_true * (odds_decimal - 1.0) - (1.0 - p_true)
@@ -1,13 +1,15 @@
 from __future__ import annotations
-import json, os, re, time
+import os, re, threading, time
 from dataclasses import dataclass
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Iterable, List, Dict, Any, Optional
 
-from playwright.sync_api import sync_playwright
+import orjson
+from pymongo.errors import BulkWriteError, PyMongoError
 from ..config import SETTINGS
 from ..db.mongo import get_db
+from ..harvest.browser import get_browser
 
 @dataclass
 class HarvestSpec:
@@ -18,25 +20,40 @@ class HarvestSpec:
     headless: bool = True
     screenshot_on_block: bool = True
     user_agent: Optional[str] = None
+    decode_allow: Optional[List[str]] = None  # URLs whose body is parsed (empty = all)
+
+# Captures are persisted in batches of this size while pages are still loading
+_FLUSH_EVERY = 50
 
 def _now_iso() -> str:
     return datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
 
-def _compile_patterns(pats: Iterable[str]) -> List[re.Pattern]:
-    out = []
+def _compile_union(pats: Iterable[str]) -> re.Pattern | List[re.Pattern]:
+    """
+    One case-insensitive alternation over all patterns (single search per URL),
+    or the per-pattern list when they cannot be joined.
+    """
+    parts = []
     for p in pats:
         try:
-            out.append(re.compile(p, re.I))
+            re.compile(p, re.I)
+            parts.append(p)
         except re.error:
             # treat as plain substring if not valid regex
-            out.append(re.compile(re.escape(p), re.I))
-    return out
+            parts.append(re.escape(p))
+    if not parts:
+        return re.compile(r"(?!)")  # nothing allowed -> never matches
+    try:
+        return re.compile("|".join(f"(?:{p})" for p in parts), re.I)
+    except re.error:
+        # Valid alone but not together (a mid-pattern "(?i)", a group name
+        # reused across entries): search them one by one
+        return [re.compile(p, re.I) for p in parts]
 
-def _match_any(url: str, regs: List[re.Pattern]) -> bool:
-    for r in regs:
-        if r.search(url):
-            return True
-    return False
+def _match_any(url: str, rx: re.Pattern | List[re.Pattern]) -> bool:
+    if isinstance(rx, re.Pattern):
+        return rx.search(url) is not None
+    return any(r.search(url) is not None for r in rx)
 
 def run_harvest(book_key: str, spec: HarvestSpec) -> int:
     """
@@ -50,32 +67,75 @@ def run_harvest(book_key: str, spec: HarvestSpec) -> int:
     raw = db.get_collection("raw_harvest")
     raw.create_index([("book", 1), ("captured_at_utc", -1)])
 
-    allow_regs = _compile_patterns(spec.xhr_allow or [])
+    allow_rx = _compile_union(spec.xhr_allow or [])
+    # Matched URLs outside decode_allow are kept as metadata only
+    decode_rx = _compile_union(spec.decode_allow) if spec.decode_allow else None
     wait_for = spec.wait_for or []
     ua = spec.user_agent or SETTINGS.user_agent
 
-    captured: List[Dict[str, Any]] = []
+    buffer: List[Dict[str, Any]] = []
+    lock = threading.Lock()
+    written = 0   # files on disk (also numbers them)
+    captured = 0  # documents accepted by Mongo
 
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=spec.headless)
-        context = browser.new_context(user_agent=ua, locale="en-US", viewport={"width":1280,"height":800})
+    def flush() -> None:
+        nonlocal written, captured
+        with lock:
+            batch = buffer[:]
+            buffer.clear()
+            first = written
+            written += len(batch)
+        if not batch:
+            return
+        for i, doc in enumerate(batch, start=first):
+            path = out_dir / f"{i:04d}.json"
+            # orjson handles the datetime natively; str() covers anything exotic
+            path.write_bytes(orjson.dumps(doc, option=orjson.OPT_INDENT_2, default=str))
+        try:
+            raw.insert_many(batch, ordered=False)
+            n = len(batch)
+        except BulkWriteError as e:
+            # unordered: everything but the failing documents was written
+            n = e.details.get("nInserted", 0)
+            print(f"[harvest] book={book_key} bulk insert kept {n}/{len(batch)}")
+        except PyMongoError as e:
+            # the JSON files above still hold this batch
+            n = 0
+            print(f"[harvest] book={book_key} mongo insert failed ({len(batch)} docs): {e}")
+        with lock:
+            captured += n
+
+    # Shared long-lived browser; a fresh context per run keeps cookies isolated
+    browser = get_browser(spec.headless)
+    context = browser.new_context(user_agent=ua, locale="en-US", viewport={"width":1280,"height":800})
+    try:
         page = context.new_page()
 
         def on_response(resp):
             try:
                 url = resp.url
-                if not _match_any(url, allow_regs):
+                if not _match_any(url, allow_rx):
                     return
                 status = resp.status
-                ct = resp.headers.get("content-type","")
+                hdrs = resp.headers  # property builds a new dict on each access
+                ct = hdrs.get("content-type","")
                 body: Any
-                try:
-                    body = resp.json()
-                except Exception:
-                    try:
-                        body = resp.text()
-                    except Exception:
-                        body = None
+                if decode_rx is not None and not _match_any(url, decode_rx):
+                    body = {"_ct": ct, "_len": int(hdrs.get("content-length") or 0)}
+                else:
+                    # Only attempt a JSON parse when the server says it is JSON
+                    parsed = False
+                    if "json" in ct.lower():
+                        try:
+                            body = resp.json()
+                            parsed = True
+                        except Exception:
+                            pass
+                    if not parsed:
+                        try:
+                            body = resp.text()
+                        except Exception:
+                            body = None
                 doc = {
                     "book": book_key,
                     "url": url,
@@ -84,7 +144,11 @@ def run_harvest(book_key: str, spec: HarvestSpec) -> int:
                     "captured_at_utc": datetime.now(timezone.utc),
                     "body": body,
                 }
-                captured.append(doc)
+                with lock:
+                    buffer.append(doc)
+                    full = len(buffer) >= _FLUSH_EVERY
+                if full:
+                    flush()
             except Exception:
                 # swallow noisy per-response failures
                 pass
@@ -108,16 +172,12 @@ def run_harvest(book_key: str, spec: HarvestSpec) -> int:
                     except Exception:
                         pass
 
-        # teardown
+    finally:
+        # teardown (the browser stays up for the next run)
         context.close()
-        browser.close()
 
-    # persist
-    for i, doc in enumerate(captured):
-        p = out_dir / f"{i:04d}.json"
-        with p.open("w", encoding="utf-8") as f:
-            json.dump(doc, f, ensure_ascii=False, indent=2, default=str)
-        raw.insert_one(doc)
+    # persist whatever is left from the last partial batch
+    flush()
 
-    print(f"[harvest] book={book_key} captured={len(captured)} saved_to={out_dir}")
-    return len(captured)
+    print(f"[harvest] book={book_key} captured={captured} saved_to={out_dir}")
+    return captured
@@ -1,2 +1,2 @@
 from __future__ import annotations
-__all__ = ["playwright_harvester"]
+__all__ = ["browser", "playwright_harvester"]
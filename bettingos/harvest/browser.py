@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import atexit
+import threading
+
+from playwright.sync_api import Browser, Playwright, sync_playwright
+
+# Sync Playwright objects are bound to the thread that started them, and the
+# scheduler runs jobs on a thread pool, so each worker keeps its own driver.
+# They can only be closed from that same thread: the atexit hook below covers
+# the main thread (CLI runs); worker threads must call close_browser() themselves.
+_local = threading.local()
+
+
+class _State:
+    def __init__(self) -> None:
+        self.pw: Playwright = sync_playwright().start()
+        self.browsers: dict[bool, Browser] = {}
+
+    def close(self) -> None:
+        for b in self.browsers.values():
+            try:
+                b.close()
+            except Exception:
+                pass
+        self.browsers.clear()
+        try:
+            self.pw.stop()
+        except Exception:
+            pass
+
+
+def get_browser(headless: bool = True) -> Browser:
+    """
+    Return a long-lived Chromium for this thread (one per headless mode),
+    relaunching it if it has disconnected. Callers create and close their own
+    context for cookie isolation and must not close the browser itself.
+    """
+    state: _State | None = getattr(_local, "state", None)
+    if state is None:
+        state = _local.state = _State()
+    browser = state.browsers.get(headless)
+    if browser is None or not browser.is_connected():
+        browser = state.browsers[headless] = state.pw.chromium.launch(headless=headless)
+    return browser
+
+
+def close_browser() -> None:
+    """Close this thread's browsers and driver, if any; get_browser() starts afresh."""
+    state: _State | None = getattr(_local, "state", None)
+    if state is not None:
+        _local.state = None
+        state.close()
+
+
+# Runs on the main thread at exit, so it only ever closes the main thread's browser
+atexit.register(close_browser)
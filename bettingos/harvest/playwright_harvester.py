@@ -1,57 +1,60 @@
 from __future__ import annotations
-import json, re, time
+import re, threading
 from pathlib import Path
 from datetime import datetime, timezone
-from typing import Any, Callable, Iterable
-import yaml
-from pymongo.errors import PyMongoError
-from playwright.sync_api import sync_playwright
+from typing import Iterable
+import orjson
+from pymongo.errors import BulkWriteError, PyMongoError
 
 from ..db.mongo import get_db
 from ..config import SETTINGS
+from ..utils.yaml_cache import load_books_by_key
+from .browser import get_browser
 
 # Where to save local debug captures
 DEBUG_DIR = Path("debug/harvest")
+# Captures are written to Mongo in batches of this size while the page runs
+_FLUSH_EVERY = 50
 
 def _now_utc():
     return datetime.now(timezone.utc)
 
-def _compile_filters(patterns: Iterable[str]) -> list[Callable[[str], bool]]:
-    """Return a list of callables that test if a URL should be kept."""
-    out: list[Callable[[str], bool]] = []
+_Filters = tuple[tuple[str, ...], tuple[re.Pattern, ...]]
+
+def _compile_filters(patterns: Iterable[str]) -> _Filters:
+    """
+    Split the allow-list into plain substrings and the regex entries, the latter
+    joined into one alternation when they can be (else compiled one by one).
+    """
+    subs: list[str] = []
+    parts: list[str] = []
     for p in patterns or []:
         p = p.strip()
         if not p:
             continue
         # Treat entries that look like regexes as regex; else substring
         is_regex = any(ch in p for ch in r".*+?[](){}|\^$")
-        if is_regex:
-            rx = re.compile(p)
-            out.append(lambda url, rx=rx: bool(rx.search(url)))
-        else:
-            out.append(lambda url, sub=p: sub in url)
-    if not out:
-        # Keep everything if no filter is present
-        out.append(lambda _url: True)
-    return out
-
-def _matches(url: str, filters: list[Callable[[str], bool]]) -> bool:
-    for f in filters:
-        if f(url):
-            return True
-    return False
+        (parts if is_regex else subs).append(p)
+    regs = tuple(re.compile(p) for p in parts)  # a bad entry still raises, as before
+    if len(regs) > 1:
+        try:
+            regs = (re.compile("|".join(f"(?:{p})" for p in parts)),)
+        except re.error:
+            # Valid alone but not together (a "(?i)" prefix, a group name
+            # reused across entries): keep searching them one by one
+            pass
+    if not subs and not regs:
+        # No filter present: "" is in every URL, so keep everything
+        subs = [""]
+    return tuple(subs), regs
+
+def _matches(url: str, filters: _Filters) -> bool:
+    subs, regs = filters
+    return any(s in url for s in subs) or any(r.search(url) is not None for r in regs)
 
 def _ensure_dir(p: Path) -> None:
     p.mkdir(parents=True, exist_ok=True)
 
-def _safe_json(obj: Any) -> Any:
-    """Best-effort conversion to JSON-serializable."""
-    try:
-        json.dumps(obj)
-        return obj
-    except Exception:
-        return {"_note": "non-json-serializable object"}
-
 def harvest_run_once(book_key: str, debug: bool = False) -> int:
     """
     Open each configured page for the given book, capture XHR/JSON responses that
@@ -60,15 +63,14 @@ def harvest_run_once(book_key: str, debug: bool = False) -> int:
     Returns the number of JSON payloads inserted into Mongo.
     """
     # --- load harvest config from books.yaml ---
-    with open("books.yaml", "r", encoding="utf-8") as f:
-        cfg = yaml.safe_load(f) or {}
-    book = next((b for b in cfg.get("books", []) if b.get("key") == book_key), None)
+    book = load_books_by_key("books.yaml").get(book_key)
     if not book:
         raise RuntimeError(f"book '{book_key}' not found in books.yaml")
 
     h = book.get("harvest") or {}
     start_urls: list[str] = h.get("start_urls", [])
     xhr_allow: list[str] = h.get("xhr_allow", [])
+    decode_allow: list[str] = h.get("decode_allow", [])
     wait_for: list[str] = h.get("wait_for", ["body"])
     headless: bool = bool(h.get("headless", True))
     max_time_s: int = int(h.get("max_time_s", 8))
@@ -77,6 +79,8 @@ def harvest_run_once(book_key: str, debug: bool = False) -> int:
         raise RuntimeError(f"book '{book_key}' has no harvest.start_urls configured")
 
     filters = _compile_filters(xhr_allow)
+    # Only these URLs get their body parsed; an empty list decodes everything
+    decoders = _compile_filters(decode_allow)
     db = get_db()
     raw_coll = db.get_collection("harvest_raw")
 
@@ -85,22 +89,40 @@ def harvest_run_once(book_key: str, debug: bool = False) -> int:
     out_dir = DEBUG_DIR / book_key
     _ensure_dir(out_dir)
     out_path = out_dir / f"{ts_tag}.jsonl"
-    fout = out_path.open("a", encoding="utf-8")
+    fout = out_path.open("ab")  # orjson emits UTF-8 bytes
 
     inserted = 0
     total_seen = 0
+    buffer: list[dict] = []
+    # Response handlers can fire while a flush is in progress
+    lock = threading.Lock()
+
+    def flush() -> None:
+        nonlocal inserted
+        with lock:
+            batch = buffer[:]
+            buffer.clear()
+        if not batch:
+            return
+        try:
+            raw_coll.insert_many(batch, ordered=False)
+            inserted += len(batch)
+        except BulkWriteError as e:
+            inserted += e.details.get("nInserted", 0)
+        except PyMongoError:
+            # Still keep debug lines; ignore DB error in this prototype
+            pass
+
+    # The browser outlives this call; only the context is ours to close
+    context = get_browser(headless).new_context(
+        user_agent=SETTINGS.user_agent,
+        ignore_https_errors=True,
+        locale="en-US",
+    )
+    try:
 
-    with sync_playwright() as pw:
-        browser = pw.chromium.launch(headless=headless)
-        context = browser.new_context(
-            user_agent=SETTINGS.user_agent,
-            ignore_https_errors=True,
-            locale="en-US",
-        )
-        page = context.new_page()
-
-        # capture handler
-        def on_response(resp):
+        # capture handler (bound per page so page_url stays accurate)
+        def on_response(resp, page):
             nonlocal inserted, total_seen
             try:
                 req = resp.request
@@ -110,13 +132,18 @@ def harvest_run_once(book_key: str, debug: bool = False) -> int:
                     return
                 if not _matches(url, filters):
                     return
-                ctype = resp.headers.get("content-type", "")
+                hdrs = resp.headers  # property builds a new dict on each access
+                ctype = hdrs.get("content-type", "")
                 if "json" not in ctype.lower():
                     return
 
                 total_seen += 1
-                # May throw if body not JSON
-                data = resp.json()
+                if _matches(url, decoders):
+                    # May throw if body not JSON
+                    data = resp.json()
+                else:
+                    # logged-only endpoint: keep metadata, skip the parse
+                    data = {"_ct": ctype, "_len": int(hdrs.get("content-length") or 0)}
                 rec = {
                     "book": book_key,
                     "page_url": page.url,
@@ -127,46 +154,65 @@ def harvest_run_once(book_key: str, debug: bool = False) -> int:
                     "json": data,
                 }
                 # write debug
-                line = json.dumps({
-                    "t": rec["captured_at_utc"].isoformat(),
+                line = orjson.dumps({
+                    "t": rec["captured_at_utc"],  # orjson writes RFC 3339
                     "page": rec["page_url"],
                     "url": rec["url"],
                     "status": rec["status"],
                     "ct": rec["content_type"],
                     "json": rec["json"],
-                }, ensure_ascii=False)
-                fout.write(line + "\n")
-
-                # insert to mongo
-                try:
-                    raw_coll.insert_one({**rec, "json": _safe_json(data)})
-                    inserted += 1
-                except PyMongoError:
-                    # Still keep debug line; ignore DB error in this prototype
-                    pass
+                })
+                fout.write(line + b"\n")
+
+                # queue for mongo; flush once a batch is full. No re-encode check:
+                # the body came from resp.json() and was just serialized above.
+                with lock:
+                    buffer.append(rec)
+                    full = len(buffer) >= _FLUSH_EVERY
+                if full:
+                    flush()
             except Exception:
                 # swallow per-response errors; this is a best-effort collector
                 return
 
-        page.on("response", on_response)
-
+        # Open every start URL in its own tab. "commit" returns once navigation
+        # has started, so all pages load (and fire XHRs) concurrently.
+        pages = []
         for url in start_urls:
-            page.goto(url, wait_until="networkidle")
+            page = context.new_page()
+            handler = lambda resp, page=page: on_response(resp, page)  # noqa: E731
+            page.on("response", handler)
+            page.goto(url, wait_until="commit")
+            pages.append((page, handler))
+
+        for page, _ in pages:
+            try:
+                page.wait_for_load_state("networkidle")
+            except Exception:
+                pass
             # Optional: wait for DOM hints to stabilize
             for sel in wait_for:
                 try:
                     page.wait_for_selector(sel, timeout=5_000)
                 except Exception:
                     pass
-            # Let background XHRs flow
-            time.sleep(max_time_s)
+        # Let background XHRs flow on all pages at once (this keeps
+        # dispatching events, unlike time.sleep)
+        if pages:
+            pages[0][0].wait_for_timeout(max_time_s * 1000)
 
         # Clean up
-        page.off("response", on_response)
-        context.close()
-        browser.close()
+        for page, handler in pages:
+            page.off("response", handler)
+    finally:
+        try:
+            context.close()
+        finally:
+            # Closed context fires no more handlers; persist the last partial
+            # batch even when a page step above raised
+            flush()
+            fout.close()
 
-    fout.close()
     if debug:
         print(f"[harvest] book={book_key} seen={total_seen} inserted={inserted} file={out_path}")
     return inserted
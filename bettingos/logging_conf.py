@@ -1,16 +1,31 @@
 import logging
+import sys
+import orjson
 import structlog
+from .config import SETTINGS
 
 def configure_logging() -> None:
-    timestamper = structlog.processors.TimeStamper(fmt="iso")
+    timestamper = structlog.processors.TimeStamper(fmt="iso", utc=True)
+    shared = [
+        structlog.processors.add_log_level,
+        timestamper,
+        structlog.processors.StackInfoRenderer(),
+        structlog.processors.format_exc_info,
+    ]
+    if sys.stdout.isatty():
+        # Interactive: colored, human-readable lines
+        processors = [*shared, structlog.dev.ConsoleRenderer()]
+        logger_factory = structlog.PrintLoggerFactory()
+    else:
+        # Services / pipes: one orjson line per event, written as bytes
+        processors = [*shared, structlog.processors.JSONRenderer(serializer=orjson.dumps)]
+        logger_factory = structlog.BytesLoggerFactory()
     structlog.configure(
-        processors=[
-            structlog.processors.add_log_level,
-            timestamper,
-            structlog.processors.StackInfoRenderer(),
-            structlog.processors.format_exc_info,
-            structlog.dev.ConsoleRenderer(),
-        ],
-        wrapper_class=structlog.make_filtering_bound_logger(logging.INFO),
-        logger_factory=structlog.PrintLoggerFactory(),
+        processors=processors,
+        # Calls below the threshold are no-ops: no processors run, nothing is formatted
+        wrapper_class=structlog.make_filtering_bound_logger(
+            logging.getLevelNamesMapping().get(SETTINGS.log_level.upper(), logging.INFO)
+        ),
+        logger_factory=logger_factory,
+        cache_logger_on_first_use=True,
     )
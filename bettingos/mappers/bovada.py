@@ -1,15 +1,13 @@
 from __future__ import annotations
-import os
-from typing import Any, List, Optional
+import re
+from typing import Any, Iterator, List, Optional
 from datetime import datetime, timezone
+from functools import lru_cache
 
-from ..models.snapshot import Snapshot
+import structlog
 
-VERBOSE = os.getenv("BOVADA_DEBUG", "0") not in ("0", "false", "False")
 
-def _dbg(msg: str) -> None:
-    if VERBOSE:
-        print(f"[bovada][map] {msg}")
+log = structlog.get_logger()
 
 def _to_dt(ts: int) -> datetime:
     # Bovada often returns milliseconds
@@ -20,13 +18,27 @@ def _to_dt(ts: int) -> datetime:
 def _lower(s: Optional[str]) -> str:
     return (s or "").strip().lower()
 
-def _find_markets(event: dict[str, Any]) -> list[dict[str, Any]]:
-    groups = event.get("displayGroups") or []
-    out: list[dict[str, Any]] = []
+def _keyword_regex(table: dict[str, tuple[str, ...] | set[str]]) -> re.Pattern:
+    """
+    Compile {label: keywords} into one alternation with a named group per label.
+    It sits inside a zero-width lookahead so finditer tries every start position
+    and overlapping keywords are all seen. At a shared start position the label
+    listed first wins, so tables go in priority order.
+    """
+    alts = "|".join(
+        f"(?P<{label}>{'|'.join(re.escape(w) for w in sorted(words))})"
+        for label, words in table.items()
+    )
+    return re.compile(f"(?=(?:{alts}))")
+
+def _labels(rx: re.Pattern, text: str) -> set[str]:
+    # One C-level scan over text finds every label with a keyword in it
+    return {m.lastgroup for m in rx.finditer(text)}
+
+def _find_markets(groups: list[dict[str, Any]]) -> Iterator[dict[str, Any]]:
+    # Streamed: map_event walks the markets once and never indexes them
     for g in groups:
-        for m in (g or {}).get("markets") or []:
-            out.append(m)
-    return out
+        yield from (g or {}).get("markets") or ()
 
 # --- Relaxed "full-time" detector ---
 _ALLOWED_FULLTIME_TOKENS = {
@@ -40,19 +52,33 @@ _PARTIAL_TOKENS = {
     "set", "map", "inning", "period",
     "first half", "second half", "first period", "second period", "third period",
 }
+# "full" first: where a full-time and a partial token start together ("m"/"map"),
+# full time wins, which is also the rule _is_fulltime applies
+_PERIOD_RE = _keyword_regex({"full": _ALLOWED_FULLTIME_TOKENS, "partial": _PARTIAL_TOKENS})
 
 def _is_fulltime(market: dict[str, Any]) -> bool:
     period = (market.get("period") or {})
     abbrev = _lower(period.get("abbreviation")) or _lower(period.get("description")) or ""
+    return _is_fulltime_abbrev(abbrev)
+
+@lru_cache(maxsize=256)
+def _is_fulltime_abbrev(abbrev: str) -> bool:
+    # A feed only uses a handful of distinct period labels, so this is nearly always a hit
     # If period is missing, assume full game
     if not abbrev:
         return True
-    if any(tok in abbrev for tok in _ALLOWED_FULLTIME_TOKENS):
-        return True
-    if any(tok in abbrev for tok in _PARTIAL_TOKENS):
-        return False
-    # Default to true — we prefer to include rather than drop valid markets
-    return True
+    hits = _labels(_PERIOD_RE, abbrev)
+    # Full-time tokens win over partial ones; default to true when neither
+    # matches — we prefer to include rather than drop valid markets
+    return "full" in hits or "partial" not in hits
+
+def _pick(oc: list[dict[str, Any]], descs: list[str], needle: Optional[str]) -> Optional[dict[str, Any]]:
+    """First outcome whose lowered description contains needle (None for an empty needle)."""
+    if needle:
+        for o, d in zip(oc, descs):
+            if needle in d:
+                return o
+    return None
 
 def _price_decimal(outcome: dict[str, Any]) -> Optional[float]:
     price = outcome.get("price") or {}
@@ -75,18 +101,57 @@ KW_3WAY = ("3-way", "3 way", "match result", "result", "regulation", "regular ti
 KW_ML = ("moneyline", "money line", "ml")
 KW_SPREAD = ("point spread", "puck line", "run line", "spread", "handicap", "line")
 KW_TOTAL = ("total", "totals", "over/under", "o/u")
+# Branch priority order; no keyword here is a prefix of another label's keyword
+_MARKET_RE = _keyword_regex({
+    "FT_1X2": KW_3WAY, "FT_ML_2W": KW_ML, "FT_SPREAD": KW_SPREAD, "FT_TOTAL": KW_TOTAL,
+})
+
+# Snapshot.doc() shape with its defaults, in field order; rows start from a copy
+_SNAP_TEMPLATE: dict[str, Any] = {
+    "captured_at_utc": None,
+    "bookmaker": None,
+    "event_key": None,
+    "sport": None,
+    "league": None,
+    "kickoff_utc": None,
+    "market_uid": None,
+    "period": "FT",
+    "selection": None,
+    "odds_decimal": None,
+    "param": None,
+    "line_status": "open",
+    "spider_version": "proto/v0",
+    "selector_version": None,
+    "source_url": None,
+    "http_status": None,
+    "parse_stage": None,
+    "raw": {},
+}
 
-def map_event(event: dict[str, Any], *, bookmaker: str, sport: str, league: str, source_url: str) -> List[Snapshot]:
+def map_event(event: dict[str, Any], *, bookmaker: str, sport: str, league: str, source_url: str) -> List[dict]:
     """
-    Normalize a single Bovada event into Snapshot rows across:
+    Normalize a single Bovada event into snapshot docs (Snapshot.doc() shape,
+    built as plain dicts to skip per-row validation) across:
     - FT_1X2 (3-way)
     - FT_ML_2W (2-way moneyline)
     - FT_SPREAD (point/puck/run line) with param
     - FT_TOTAL (over/under) with param
     """
-    snaps: List[Snapshot] = []
+    snaps: List[dict] = []
     eid = str(event.get("id") or event.get("eventId") or "")
     kickoff = _to_dt(event.get("startTime") or 0)
+    # One capture time for every row of this mapping pass
+    base = {
+        **_SNAP_TEMPLATE,
+        "captured_at_utc": datetime.now(timezone.utc),
+        "bookmaker": bookmaker,
+        "event_key": eid,
+        "sport": sport,
+        "league": league,
+        "kickoff_utc": kickoff,
+        "source_url": source_url,
+        "parse_stage": "normalized",
+    }
 
     comps = event.get("competitors") or []
     home_name = away_name = None
@@ -96,11 +161,14 @@ def map_event(event: dict[str, Any], *, bookmaker: str, sport: str, league: str,
         else: away_name = n
     home_name = home_name or (comps[0]["name"] if comps else "Home")
     away_name = away_name or (comps[1]["name"] if len(comps) > 1 else "Away")
+    hn = (home_name or "").lower()
+    an = (away_name or "").lower()
+    event_meta = {"home": home_name, "away": away_name}
 
     total_markets = 0
     mapped_markets = 0
 
-    for m in _find_markets(event):
+    for m in _find_markets(event.get("displayGroups") or []):
         total_markets += 1
         if not _is_fulltime(m):
             continue
@@ -109,14 +177,18 @@ def map_event(event: dict[str, Any], *, bookmaker: str, sport: str, league: str,
         oc = m.get("outcomes") or []
         if not oc:
             continue
+        kinds = _labels(_MARKET_RE, desc)
+        oc_descs = [_lower(o.get("description")) for o in oc]
+        # shared by every row of this market (docs are only inserted, never mutated)
+        raw = {"event": event_meta, "market": m}
 
         # 3-way (soccer + some hockey "regulation" lines)
-        if (any(k in desc for k in KW_3WAY) and len(oc) >= 3):
-            by_desc = { _lower(o.get("description")): o for o in oc }
+        if "FT_1X2" in kinds and len(oc) >= 3:
+            by_desc = dict(zip(oc_descs, oc))
             draw = by_desc.get("draw") or by_desc.get("tie")
             # try match teams by name; fallback by order
-            home_o = next((o for o in oc if home_name and home_name.lower() in _lower(o.get("description"))), None) or oc[0]
-            away_o = next((o for o in oc if away_name and away_name.lower() in _lower(o.get("description"))), None) or oc[-1]
+            home_o = _pick(oc, oc_descs, hn) or oc[0]
+            away_o = _pick(oc, oc_descs, an) or oc[-1]
             ordered = [home_o, draw or (oc[1] if len(oc) > 1 else None), away_o]
             labels = ["home", "draw", "away"]
             for label, outc in zip(labels, ordered):
@@ -125,24 +197,20 @@ def map_event(event: dict[str, Any], *, bookmaker: str, sport: str, league: str,
                 dec = _price_decimal(outc)
                 if not dec:
                     continue
-                snaps.append(Snapshot(
-                    bookmaker=bookmaker,
-                    event_key=eid,
-                    sport=sport, league=league, kickoff_utc=kickoff,
-                    market_uid="FT_1X2",
-                    selection=label,
-                    odds_decimal=dec,
-                    source_url=source_url,
-                    parse_stage="normalized",
-                    raw={"event": {"home": home_name, "away": away_name}, "market": m},
-                ))
+                snaps.append({
+                    **base,
+                    "market_uid": "FT_1X2",
+                    "selection": label,
+                    "odds_decimal": dec,
+                    "raw": raw,
+                })
             mapped_markets += 1
             continue
 
         # 2-way Moneyline (NBA/NHL/Tennis/etc.)
-        if any(k in desc for k in KW_ML) and len(oc) >= 2:
-            home_o = next((o for o in oc if home_name and home_name.lower() in _lower(o.get("description"))), None)
-            away_o = next((o for o in oc if away_name and away_name.lower() in _lower(o.get("description"))), None)
+        if "FT_ML_2W" in kinds and len(oc) >= 2:
+            home_o = _pick(oc, oc_descs, hn)
+            away_o = _pick(oc, oc_descs, an)
             # Fallback to first two outcomes if name matching doesn't work
             if not home_o or not away_o:
                 if len(oc) >= 2:
@@ -154,48 +222,39 @@ def map_event(event: dict[str, Any], *, bookmaker: str, sport: str, league: str,
                 dec = _price_decimal(outc)
                 if not dec:
                     continue
-                snaps.append(Snapshot(
-                    bookmaker=bookmaker,
-                    event_key=eid,
-                    sport=sport, league=league, kickoff_utc=kickoff,
-                    market_uid="FT_ML_2W",
-                    selection=label,
-                    odds_decimal=dec,
-                    source_url=source_url,
-                    parse_stage="normalized",
-                    raw={"event": {"home": home_name, "away": away_name}, "market": m},
-                ))
+                snaps.append({
+                    **base,
+                    "market_uid": "FT_ML_2W",
+                    "selection": label,
+                    "odds_decimal": dec,
+                    "raw": raw,
+                })
             mapped_markets += 1
             continue
 
         # Spreads (Point/Puck/Run line)
-        if any(k in desc for k in KW_SPREAD) and len(oc) >= 2:
-            for outc in oc:
-                d = _lower(outc.get("description"))
+        if "FT_SPREAD" in kinds and len(oc) >= 2:
+            for outc, d in zip(oc, oc_descs):
                 dec = _price_decimal(outc)
                 hcap = _price_handicap(outc)
                 if not dec or hcap is None:
                     continue
-                label = "home" if (home_name and home_name.lower() in d) else "away"
-                snaps.append(Snapshot(
-                    bookmaker=bookmaker,
-                    event_key=eid,
-                    sport=sport, league=league, kickoff_utc=kickoff,
-                    market_uid="FT_SPREAD",
-                    selection=label,
-                    param=hcap,
-                    odds_decimal=dec,
-                    source_url=source_url,
-                    parse_stage="normalized",
-                    raw={"event": {"home": home_name, "away": away_name}, "market": m},
-                ))
+                label = "home" if (hn and hn in d) else "away"
+                snaps.append({
+                    **base,
+                    "market_uid": "FT_SPREAD",
+                    "selection": label,
+                    "odds_decimal": dec,
+                    "param": hcap,
+                    "raw": raw,
+                })
             mapped_markets += 1
             continue
 
         # Totals (Over/Under)
-        if any(k in desc for k in KW_TOTAL) and len(oc) >= 2:
-            over = next((o for o in oc if "over" in _lower(o.get("description"))), None)
-            under = next((o for o in oc if "under" in _lower(o.get("description"))), None)
+        if "FT_TOTAL" in kinds and len(oc) >= 2:
+            over = _pick(oc, oc_descs, "over")
+            under = _pick(oc, oc_descs, "under")
             # Fallback if labels missing
             if not over and len(oc) >= 1:
                 over = oc[0]
@@ -208,26 +267,18 @@ def map_event(event: dict[str, Any], *, bookmaker: str, sport: str, league: str,
                 hcap = _price_handicap(outc)
                 if not dec or hcap is None:
                     continue
-                snaps.append(Snapshot(
-                    bookmaker=bookmaker,
-                    event_key=eid,
-                    sport=sport, league=league, kickoff_utc=kickoff,
-                    market_uid="FT_TOTAL",
-                    selection=label,
-                    param=hcap,
-                    odds_decimal=dec,
-                    source_url=source_url,
-                    parse_stage="normalized",
-                    raw={"event": {"home": home_name, "away": away_name}, "market": m},
-                ))
+                snaps.append({
+                    **base,
+                    "market_uid": "FT_TOTAL",
+                    "selection": label,
+                    "odds_decimal": dec,
+                    "param": hcap,
+                    "raw": raw,
+                })
             mapped_markets += 1
             continue
 
-    if VERBOSE:
-        try:
-            total_m = sum(len((g or {}).get("markets") or []) for g in (event.get("displayGroups") or []))
-        except Exception:
-            total_m = total_markets
-        _dbg(f"event id={eid} markets={total_m} mapped={mapped_markets} snaps={len(snaps)}")
+    # total_markets was counted during the walk above; no second pass over displayGroups
+    log.debug("bovada_map_event", event_id=eid, markets=total_markets, mapped=mapped_markets, snaps=len(snaps))
 
     return snaps
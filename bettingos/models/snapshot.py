@@ -1,10 +1,13 @@
 from __future__ import annotations
 from typing import Any, Optional
-from pydantic import BaseModel, Field
+import msgspec
 from datetime import datetime, timezone
 
-class Snapshot(BaseModel):
-    captured_at_utc: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+class Snapshot(msgspec.Struct, kw_only=True):
+    # A plain typed record: Snapshot(...) does no validation or coercion, so
+    # internal mappers pass already-typed values (float odds, aware datetimes).
+    # Untrusted scraped fields go through msgspec.convert(..., Snapshot) instead.
+    captured_at_utc: datetime = msgspec.field(default_factory=lambda: datetime.now(timezone.utc))
     bookmaker: str
     event_key: str
     sport: str
@@ -24,7 +27,5 @@ class Snapshot(BaseModel):
     raw: dict[str, Any] = {}
 
     def doc(self) -> dict:
-        d = self.model_dump()
-        d["captured_at_utc"] = self.captured_at_utc
-        d["kickoff_utc"] = self.kickoff_utc
-        return d
+        # Shallow field dict in declaration order; datetimes stay as-is for BSON
+        return msgspec.structs.asdict(self)
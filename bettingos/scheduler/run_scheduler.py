@@ -1,5 +1,6 @@
 from __future__ import annotations
 import os
+import threading
 import time
 import yaml
 from apscheduler.schedulers.background import BackgroundScheduler
@@ -10,18 +11,56 @@ import structlog
 
 log = structlog.get_logger()
 
+# Suffix -> seconds; "ms" must be tried before "s" and "m"
+_DUR_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
 def _parse_dur(s: str) -> int:
     s = (s or "").strip().lower()
-    if s.endswith("ms"): return int(float(s[:-2]) / 1000)
-    if s.endswith("s"):  return int(float(s[:-1]))
-    if s.endswith("m"):  return int(float(s[:-1]) * 60)
-    if s.endswith("h"):  return int(float(s[:-1]) * 3600)
+    for suffix, mult in _DUR_UNITS.items():
+        if s.endswith(suffix):
+            return int(float(s[:-len(suffix)]) * mult)
     return int(s or 0)
 
 def _load_yaml(path: str) -> dict:
     with open(path, "r", encoding="utf-8") as f:
         return yaml.safe_load(f) or {}
 
+_runner = None  # scrapy CrawlerRunner, shared by every scrapy job
+_runner_lock = threading.Lock()
+
+def _crawler_runner():
+    """Start the Twisted reactor on a daemon thread (once) and return the shared runner."""
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            from scrapy.crawler import CrawlerRunner
+            from scrapy.utils.project import get_project_settings
+            from twisted.internet import reactor
+            settings = get_project_settings()
+            if not settings.getlist("SPIDER_MODULES"):
+                settings.set("SPIDER_MODULES", ["bettingos.spiders"])
+            _runner = CrawlerRunner(settings)
+            # APScheduler isn't reactor-aware, so the reactor gets its own thread
+            threading.Thread(
+                target=reactor.run, kwargs={"installSignalHandlers": False},
+                name="twisted-reactor", daemon=True,
+            ).start()
+    return _runner
+
+def _stop_reactor() -> None:
+    if _runner is not None:
+        from twisted.internet import reactor
+        reactor.callFromThread(reactor.stop)
+
+def _scrapy_job(book_key: str):
+    def _run():
+        from twisted.internet import reactor, threads
+        runner = _crawler_runner()
+        # Block this scheduler worker until the crawl finishes, so max_instances
+        # and the failure backoff still see the real outcome
+        return threads.blockingCallFromThread(reactor, runner.crawl, book_key)
+    return _run
+
 def _job_fn(book_key: str, kind: str):
     # Lazy import so we only pull a module if enabled
     if kind == "proto":
@@ -32,7 +71,8 @@ def _job_fn(book_key: str, kind: str):
             from ..spiders.proto import bovada_proto
             return bovada_proto.run_once
     if kind == "scrapy":
-        return lambda: os.system(f"python -m scrapy crawl {book_key}")  # placeholder for real spiders
+        # in-process crawl on the shared reactor (no interpreter fork per tick)
+        return _scrapy_job(book_key)
     return lambda: 0
 
 def main():
@@ -49,11 +89,19 @@ def main():
     b_initial = _parse_dur(backoff_cfg.get("initial", "30s")) or 30
     b_factor = float(str(backoff_cfg.get("factor", "2")))
     b_max = _parse_dur(backoff_cfg.get("max", "600")) or 600
+    books_by_key: dict[str, dict] = {}
+    for b in books_cfg.get("books", []):
+        if b.get("key"):
+            books_by_key.setdefault(str(b["key"]), b)
 
     sched = BackgroundScheduler()
     failure_state: dict[str, dict] = {}
+    # Set once shutdown begins; jobs still running then release their thread's browser.
+    # Idle workers' browsers are not reachable from here and end with the process.
+    stopping = threading.Event()
 
-    def wrap_run(book_key: str, fn):
+    def wrap_run(book_key: str, fn, base_every: int):
+        # base_every is the book's parsed cadence, captured once at add_job time
         def _inner():
             if os.path.exists(SETTINGS.kill_file):
                 log.warning("Kill switch engaged; skipping run", book=book_key)
@@ -65,8 +113,6 @@ def main():
                 st["fails"] = 0
                 # restore cadence after backoff
                 if st.get("interval"):
-                    bk = next((b for b in books_cfg.get("books", []) if b.get("key") == book_key), None)
-                    base_every = _parse_dur(str(bk.get("cadence"))) if bk and bk.get("cadence") else cadence_default
                     job = sched.get_job(job_id)
                     if job:
                         sched.reschedule_job(job.id, trigger=IntervalTrigger(seconds=base_every))
@@ -80,17 +126,22 @@ def main():
                     sched.reschedule_job(job.id, trigger=IntervalTrigger(seconds=delay))
                     st["interval"] = delay
                 log.warning("job_fail_backoff", book=book_key, fails=st["fails"], next_interval_s=delay, error=str(e))
+            finally:
+                if stopping.is_set():
+                    # Playwright objects can only be closed on the thread that
+                    # opened them, and this worker won't get another job
+                    from ..harvest.browser import close_browser
+                    close_browser()
         return _inner
 
-    for b in books_cfg.get("books", []):
+    for key, b in books_by_key.items():
         if not b.get("enabled", False):
-            log.info("book_disabled", book=b.get("key"))
+            log.info("book_disabled", book=key)
             continue
-        key = str(b.get("key"))
         every = _parse_dur(str(b.get("cadence"))) if b.get("cadence") else cadence_default
         kind = "proto" if b.get("proto") else "scrapy"
         fn = _job_fn(key, kind)
-        sched.add_job(wrap_run(key, fn), "interval", seconds=every, id=key, max_instances=1, coalesce=True)
+        sched.add_job(wrap_run(key, fn, every), "interval", seconds=every, id=key, max_instances=1, coalesce=True)
         log.info("scheduled", job=key, every_seconds=every, kind=kind)
 
     sched.start()
@@ -102,7 +153,9 @@ def main():
                 log.warning("Kill switch engaged; shutting down")
                 break
     finally:
+        stopping.set()
         sched.shutdown(wait=False)
+        _stop_reactor()
         log.info("scheduler_stopped")
 
 if __name__ == "__main__":
@@ -1,20 +1,36 @@
 from __future__ import annotations
-import json, os, yaml, requests
+import os, orjson, requests
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
+from urllib3.util.retry import Retry
 from ...config import SETTINGS
-from ...db.mongo import insert_snapshot
+from ...db.mongo import insert_snapshots
+from ...utils.timebox import from_epoch
+from ...utils.yaml_cache import load_books_by_key
 
 BOOKMAKER = "betonline"
+_MAX_FETCH_WORKERS = 16
 
 HEADERS = {
     "User-Agent": SETTINGS.user_agent,
     "Accept": "application/json, text/plain, */*",
 }
 
+# Keep-alive pool shared by every poll, so repeat fetches skip the TCP/TLS handshake
+_SESSION = requests.Session()
+_SESSION.headers.update(HEADERS)
+# urllib3 only lists "br" here when a brotli decoder is installed
+_SESSION.headers["Accept-Encoding"] = ACCEPT_ENCODING
+_adapter = HTTPAdapter(pool_connections=16, pool_maxsize=64, max_retries=Retry(total=2, backoff_factor=0.2))
+_SESSION.mount("https://", _adapter)
+_SESSION.mount("http://", _adapter)
+
 def fetch_json(url: str):
-    r = requests.get(url, timeout=15, headers=HEADERS)
+    r = _SESSION.get(url, timeout=15)
     r.raise_for_status()
-    try: return r.json()
-    except Exception: return json.loads(r.text)
+    return orjson.loads(r.content)
 
 def _iter_events(payload):
     if payload is None: return
@@ -32,6 +48,8 @@ def map_event_generic(evt: dict, *, sport: str, league: str, source_url: str):
     from ...models.snapshot import Snapshot   # local import
     snaps = []
     eid = str(evt.get("id") or evt.get("eventId") or evt.get("gameId") or "")
+    # Real kickoff when the feed sends one; otherwise one placeholder for the whole event
+    kickoff = from_epoch(evt.get("startTime")) or datetime.now(timezone.utc)
     mkts = evt.get("markets") or evt.get("lines") or []
     # Try to detect common shapes:
     for m in mkts:
@@ -45,24 +63,25 @@ def map_event_generic(evt: dict, *, sport: str, league: str, source_url: str):
                 if not dec: continue
                 snaps.append(Snapshot(
                     bookmaker=BOOKMAKER, event_key=eid, sport=sport, league=league,
-                    kickoff_utc=Snapshot.model_fields["captured_at_utc"].default_factory(),  # placeholder if no startTime
+                    kickoff_utc=kickoff,
                     market_uid="FT_ML_2W", selection=label, odds_decimal=float(dec),
                     source_url=source_url, parse_stage="normalized", raw={"event": evt, "market": m},
                 ))
     return snaps
 
 def run_once() -> int:
-    cfg = yaml.safe_load(open("books.yaml","r",encoding="utf-8")) or {}
-    book = next((b for b in cfg.get("books", []) if b.get("key") == BOOKMAKER and b.get("enabled")), None)
-    if not book: return 0
-    feeds = (book.get("proto") or {}).get("feeds") or []
+    book = load_books_by_key("books.yaml").get(BOOKMAKER)
+    if not book or not book.get("enabled"): return 0
+    feeds = [f for f in (book.get("proto") or {}).get("feeds") or [] if (f.get("url") or "").strip()]
+    urls = [f["url"].strip() for f in feeds]
     total = 0
-    for f in feeds:
-        url = (f.get("url") or "").strip()
-        if not url: continue
-        payload = fetch_json(url)
-        for evt in _iter_events(payload):
-            snaps = map_event_generic(evt, sport=str(f.get("sport") or ""), league=str(f.get("league") or ""), source_url=url)
-            for s in snaps:
-                insert_snapshot(s.doc()); total += 1
+    # Fetch concurrently (I/O bound; the Session pool is sized for it); map + write here.
+    # map() yields in feed order and re-raises a fetch error just like the serial loop did.
+    with ThreadPoolExecutor(max_workers=max(1, min(len(urls), _MAX_FETCH_WORKERS))) as ex:
+        for f, url, payload in zip(feeds, urls, ex.map(fetch_json, urls)):
+            batch = []
+            for evt in _iter_events(payload):
+                snaps = map_event_generic(evt, sport=str(f.get("sport") or ""), league=str(f.get("league") or ""), source_url=url)
+                batch.extend(s.doc() for s in snaps)
+            total += insert_snapshots(batch)
     return total
@@ -1,14 +1,21 @@
 from __future__ import annotations
-import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Any, Iterable
-from datetime import datetime, timezone
-import yaml
+from datetime import datetime
+import orjson
+import structlog
 
+from ...ev.calc import american_to_decimal
 from ...utils.http import fetch
-from ...db.mongo import insert_snapshot
+from ...utils.timebox import from_epoch
+from ...utils.yaml_cache import load_books_by_key
+from ...db.mongo import insert_snapshots
 from ...models.snapshot import Snapshot
 
 BOOKMAKER = "bovada"
+log = structlog.get_logger()
+# Feed fetches are pure I/O; cap the pool so one book can't open a flood of sockets
+_MAX_FETCH_WORKERS = 16
 
 def _to_decimal(price_obj: dict) -> float | None:
     if not isinstance(price_obj, dict):
@@ -19,29 +26,31 @@ def _to_decimal(price_obj: dict) -> float | None:
     am = price_obj.get("american")
     if isinstance(am, str) and am.strip():
         try:
-            x = int(am)
-            if x > 0:
-                return 1.0 + x / 100.0
-            if x < 0:
-                return 1.0 + 100.0 / abs(x)
+            return american_to_decimal(int(am))
         except ValueError:
             return None
     return None
 
-def _norm_sel(out_desc: str, out_type: str | None, home_name: str, away_name: str) -> str | None:
-    s = (out_desc or "").strip().lower()
-    t = (out_type or "").strip().upper()
-    # Bovada often sets type: "H", "A", "D" (draw), or "O"/"U" for totals
-    if t in ("H", "HOME"): return "home"
-    if t in ("A", "AWAY"): return "away"
-    if t in ("D", "DRAW", "X"): return "draw"
-    if t in ("O", "OVER"): return "over"
-    if t in ("U", "UNDER"): return "under"
+# Bovada often sets type: "H", "A", "D" (draw), or "O"/"U" for totals
+_TYPE_MAP = {
+    "H": "home", "HOME": "home",
+    "A": "away", "AWAY": "away",
+    "D": "draw", "DRAW": "draw", "X": "draw",
+    "O": "over", "OVER": "over",
+    "U": "under", "UNDER": "under",
+}
+_DESC_MAP = {"over": "over", "o": "over", "under": "under", "u": "under"}
+
+def _norm_sel(out_desc: str, out_type: str | None, home_l: str, away_l: str) -> str | None:
+    """home_l/away_l are the team names already lowercased by the caller."""
+    r = _TYPE_MAP.get((out_type or "").strip().upper())
+    if r: return r
     # Fallback by comparing strings
-    if s in ("over", "o"): return "over"
-    if s in ("under", "u"): return "under"
-    if home_name and s.lower().startswith(home_name.lower()): return "home"
-    if away_name and s.lower().startswith(away_name.lower()): return "away"
+    s = (out_desc or "").strip().lower()
+    r = _DESC_MAP.get(s)
+    if r: return r
+    if home_l and s.startswith(home_l): return "home"
+    if away_l and s.startswith(away_l): return "away"
     if s == "draw": return "draw"
     return None
 
@@ -71,12 +80,7 @@ def _is_live(evt: dict) -> bool:
 
 def _kickoff(evt: dict) -> datetime | None:
     # startTime often in ms
-    ts = evt.get("startTime")
-    if isinstance(ts, (int, float)) and ts > 10_000_000_000:
-        ts /= 1000.0
-    if isinstance(ts, (int, float)) and ts > 0:
-        return datetime.fromtimestamp(ts, tz=timezone.utc)
-    return None
+    return from_epoch(evt.get("startTime"))
 
 def _home_away(evt: dict) -> tuple[str, str]:
     home = away = ""
@@ -106,6 +110,7 @@ def _market_uid(mdesc: str, mm: dict) -> str | None:
 
 def _yield_from_event(evt: dict, market_map: dict, src_url: str) -> Iterable[Snapshot]:
     home, away = _home_away(evt)
+    home_l, away_l = home.lower(), away.lower()
     in_play = _is_live(evt)
     ko = _kickoff(evt)
     event_key = str(evt.get("id") or evt.get("eventId") or evt.get("link") or evt.get("description"))
@@ -120,7 +125,7 @@ def _yield_from_event(evt: dict, market_map: dict, src_url: str) -> Iterable[Sna
                 price = _to_decimal(out.get("price") or {})
                 if not price:
                     continue
-                sel = _norm_sel(out.get("description",""), out.get("type"), home, away)
+                sel = _norm_sel(out.get("description",""), out.get("type"), home_l, away_l)
                 if not sel:
                     continue
                 param = _line_from(out, m) if uid in ("FT_SPREAD","FT_TOTAL") else None
@@ -137,64 +142,70 @@ def _yield_from_event(evt: dict, market_map: dict, src_url: str) -> Iterable[Sna
                     raw={"evt_id": evt.get("id"), "mdesc": mdesc, "out": out},
                 )
 
+def _fetch_events(url: str) -> list[dict] | None:
+    """GET one feed and flatten its category blocks into events; None if unusable."""
+    try:
+        # nocache=True is critical for “live” behavior with CF/ETag
+        r = fetch(url, timeout=15, nocache=True)
+    except Exception as e:
+        log.error("bovada_fetch_fail", url=url, err=str(e))
+        return None
+
+    if r.status_code != 200:
+        log.warning("bovada_bad_status", url=url, status=r.status_code)
+        return None
+
+    if not r.content:
+        # 304 path isn’t expected with nocache=True; just skip
+        return None
+
+    try:
+        # Parse the raw bytes directly: no charset sniffing or str decode first
+        payload = orjson.loads(r.content)
+    except orjson.JSONDecodeError as e:
+        log.error("bovada_parse_fail", url=url, err=str(e))
+        return None
+
+    # Bovada returns a list of category blocks; each has "events"
+    blocks = payload if isinstance(payload, list) else [payload]
+    events = []
+    for b in blocks:
+        evs = b.get("events") if isinstance(b, dict) else None
+        if isinstance(evs, list):
+            events.extend(evs)
+    return events
+
 def run_once() -> int:
-    with open("books.yaml","r",encoding="utf-8") as f:
-        books = yaml.safe_load(f) or {}
-    bov = next((b for b in books.get("books",[]) if b.get("key")=="bovada"), None)
+    bov = load_books_by_key("books.yaml").get(BOOKMAKER)
     if not bov or not bov.get("enabled", False):
         return 0
 
-    feeds = (bov.get("proto") or {}).get("feeds") or []
+    feeds = [f for f in (bov.get("proto") or {}).get("feeds") or [] if f.get("url")]
     market_map = bov.get("market_map") or {}
     inserted = 0
 
-    for feed in feeds:
-        url = feed.get("url")
-        if not url:
-            continue
-        try:
-            # nocache=True is critical for “live” behavior with CF/ETag
-            r = fetch(url, timeout=15, nocache=True)
-        except Exception as e:
-            print(f"[bovada] ERROR fetching {url}: {e}")
-            continue
-
-        if r.status_code != 200:
-            print(f"[bovada] WARN {url} -> {r.status_code}")
-            continue
-
-        if not r.content:
-            # 304 path isn’t expected with nocache=True; just skip
-            continue
-
-        try:
-            payload = r.json()
-        except Exception:
-            # Some endpoints wrap JSON in text; try to parse
-            try:
-                payload = json.loads(r.text)
-            except Exception as e:
-                print(f"[bovada] ERROR parse json {url}: {e}")
+    # Fetch all feeds concurrently; mapping and Mongo writes stay on this thread
+    with ThreadPoolExecutor(max_workers=max(1, min(len(feeds), _MAX_FETCH_WORKERS))) as ex:
+        futures = {ex.submit(_fetch_events, feed["url"]): feed for feed in feeds}
+        for fut in as_completed(futures):
+            feed = futures[fut]
+            url = feed["url"]
+            events = fut.result()
+            if events is None:
                 continue
 
-        # Bovada returns a list of category blocks; each has "events"
-        blocks = payload if isinstance(payload, list) else [payload]
-        events = []
-        for b in blocks:
-            evs = b.get("events") if isinstance(b, dict) else None
-            if isinstance(evs, list):
-                events.extend(evs)
-
-        snaps = 0
-        for evt in events:
-            for snap in _yield_from_event(evt, market_map, url):
-                insert_snapshot(snap.doc())
-                inserted += 1
-                snaps += 1
-
-        if snaps == 0:
-            # Debug visibility without being noisy
-            print(f"[bovada] feed sport={feed.get('sport')} league={feed.get('league')} -> events={len(events)}, snaps=0")
-
-    print(f"[bovada] total snapshots inserted: {inserted}")
+            # one batched write per feed instead of a round-trip per outcome
+            snaps = insert_snapshots([
+                snap.doc() for evt in events for snap in _yield_from_event(evt, market_map, url)
+            ])
+            inserted += snaps
+
+            if snaps == 0:
+                # Debug visibility without being noisy
+                log.info(
+                    "bovada_feed_empty",
+                    sport=feed.get("sport"), league=feed.get("league"), events=len(events),
+                )
+
+    log.info("bovada_run_done", inserted=inserted)
     return inserted
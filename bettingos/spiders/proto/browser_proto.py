@@ -1,19 +1,19 @@
 from __future__ import annotations
-import yaml
 from ...config import SETTINGS
 from ...fetchers.harvest import HarvestSpec, run_harvest
+from ...utils.yaml_cache import load_books_by_key
 
 def run_once(book_key: str) -> int:
     # Read spec from books.yaml
-    data = yaml.safe_load(open("books.yaml","r",encoding="utf-8")) or {}
-    book = next((b for b in data.get("books", []) if b.get("key") == book_key and b.get("enabled")), None)
-    if not book:
+    book = load_books_by_key("books.yaml").get(book_key)
+    if not book or not book.get("enabled"):
         print(f"[browser-proto] book '{book_key}' not enabled or missing in books.yaml")
         return 0
     harvest = (book.get("harvest") or {})
     start_urls = [str(u) for u in (harvest.get("start_urls") or [])]
     xhr_allow = [str(x) for x in (harvest.get("xhr_allow") or [])]
     wait_for = [str(s) for s in (harvest.get("wait_for") or [])]
+    decode_allow = [str(x) for x in (harvest.get("decode_allow") or [])]
     max_time_s = int(harvest.get("max_time_s", 10))
     headless = bool(harvest.get("headless", True))
     spec = HarvestSpec(
@@ -23,5 +23,6 @@ def run_once(book_key: str) -> int:
         max_time_s=max_time_s,
         headless=headless,
         user_agent=SETTINGS.user_agent,
+        decode_allow=decode_allow,
     )
     return run_harvest(book_key, spec)
@@ -2,16 +2,22 @@
 from __future__ import annotations
 
 import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from typing import Any, Dict, Iterable, List, Optional
 from datetime import datetime, timezone
 
 import httpx
-import yaml
+import orjson
 
 from ...models.snapshot import Snapshot
-from ...db.mongo import insert_snapshot
+from ...db.mongo import insert_snapshots
+from ...ev.calc import american_to_decimal
+from ...utils.yaml_cache import load_books_by_key
 
 BOOKMAKER = "cloudbet"
+_MAX_FETCH_WORKERS = 16
 
 # Map Cloudbet market keys -> our normalized market_uids and required selection labels
 MARKET_MAP: dict[str, tuple[str, tuple[str, ...]]] = {
@@ -21,6 +27,8 @@ MARKET_MAP: dict[str, tuple[str, tuple[str, ...]]] = {
     "ice-hockey.moneyline": ("FT_ML_2W", ("home", "away")),
     "tennis.winner": ("FT_ML_2W", ("home", "away")),
 }
+# Required labels as sets, for the completeness check (the tuples keep insert order)
+_WANTED_BY_MARKET = {k: frozenset(v[1]) for k, v in MARKET_MAP.items()}
 
 # Outcome normalization
 _OUTCOME_MAP = {
@@ -29,6 +37,11 @@ _OUTCOME_MAP = {
     "draw": "draw", "x": "draw", "tie": "draw",
 }
 
+@lru_cache(maxsize=2048)
+def _canon_outcome(raw: str) -> Optional[str]:
+    """Outcome text as sent -> canonical label; feeds repeat a handful of spellings."""
+    return _OUTCOME_MAP.get(raw.strip().lower())
+
 def _get_api_key() -> str:
     key = os.getenv("CLOUDBET_API_KEY", "").strip()
     if not key:
@@ -44,20 +57,18 @@ def _client() -> httpx.Client:
         },
         timeout=15.0,
         follow_redirects=True,
+        # concurrent feed requests share one multiplexed connection
+        http2=True,
     )
 
 def _load_proto_block() -> dict:
-    with open("books.yaml", "r", encoding="utf-8") as f:
-        cfg = yaml.safe_load(f) or {}
-    for b in cfg.get("books", []):
-        if b.get("key") == "cloudbet":
-            return b.get("proto", {}) or {}
-    return {}
+    b = load_books_by_key().get(BOOKMAKER) or {}
+    return b.get("proto", {}) or {}
 
 # ------------------------------- Kickoff helpers -------------------------------
 
 # Keys we’ll look for anywhere in the event (deep search) to find kickoff
-_KICKOFF_KEYS = [
+_KICKOFF_KEYS = (
     "startTime", "start_time", "startsAt", "start", "kickoff", "kickOff",
     "kickoffTime", "scheduledStartTime", "startTimestamp", "start_time_unix",
     "startTimeUnix", "startTimeSec", "time", "t",
@@ -65,7 +76,8 @@ _KICKOFF_KEYS = [
     "epoch", "seconds", "millis", "ms",
     # sometimes in nested blocks:
     "fixtureStartTime", "eventStart", "startDate",
-]
+)
+_KICKOFF_SET = frozenset(_KICKOFF_KEYS)
 
 def _coerce_kickoff(value: Any) -> Optional[datetime]:
     """
@@ -76,7 +88,8 @@ def _coerce_kickoff(value: Any) -> Optional[datetime]:
         return None
     if isinstance(value, str):
         try:
-            dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+            # 3.11's C fromisoformat takes a trailing "Z" as-is
+            dt = datetime.fromisoformat(value)
             return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
         except Exception:
             # sometimes numeric encoded as string
@@ -112,24 +125,28 @@ def _deep_get_kickoff(event: dict, debug: bool = False) -> Optional[datetime]:
     Deep search the event for a plausible kickoff field using a BFS over dict/list.
     """
     seen_ids = set()
-    q: list[Any] = [event]
+    # Only dicts/lists are queued (scalars have nothing to search), so seen_ids
+    # tracks containers alone.
+    q: deque[Any] = deque([event])
     while q:
-        node = q.pop(0)
+        node = q.popleft()
         if id(node) in seen_ids:
             continue
         seen_ids.add(id(node))
 
         if isinstance(node, dict):
-            # fast path: direct known keys
-            for k in _KICKOFF_KEYS:
-                if k in node and node[k] is not None:
-                    dt = _coerce_kickoff(node[k])
-                    if dt:
-                        return dt
+            # fast path: direct known keys, tried in priority order; most nodes
+            # carry none of them, which one set check rules out
+            if not _KICKOFF_SET.isdisjoint(node):
+                for k in _KICKOFF_KEYS:
+                    if k in node and node[k] is not None:
+                        dt = _coerce_kickoff(node[k])
+                        if dt:
+                            return dt
             # BFS into children
-            q.extend(node.values())
+            q.extend(v for v in node.values() if isinstance(v, (dict, list)))
         elif isinstance(node, list):
-            q.extend(node)
+            q.extend(v for v in node if isinstance(v, (dict, list)))
     return None
 
 # ------------------------------ Market helpers --------------------------------
@@ -141,6 +158,10 @@ def _price_from_sel(sel: dict) -> Optional[float]:
     - decimalOdds / oddsDecimal / odds
     If only american odds (+110/-130) are present, try to convert.
     """
+    # fast path: the API normally sends a JSON number under "price"
+    v = sel.get("price")
+    if type(v) is float:
+        return v
     # decimal-ish
     for k in ("price", "decimalOdds", "oddsDecimal", "odds", "d"):
         v = sel.get(k)
@@ -155,81 +176,74 @@ def _price_from_sel(sel: dict) -> Optional[float]:
     am = sel.get("americanOdds") or sel.get("american")
     if isinstance(am, (int, float, str)):
         try:
-            a = float(am)
-            if a > 0:
-                return 1.0 + (a / 100.0)
-            else:
-                return 1.0 + (100.0 / abs(a))
-        except Exception:
+            return american_to_decimal(float(am))
+        except ValueError:
             return None
     return None
 
-def _iter_selections(event: dict, market_key: str) -> Iterable[dict]:
+def _build_event_index(event: dict, keys: frozenset[str]) -> dict[str, dict[str, float]]:
     """
-    Support both dict- and list-shaped 'markets'.
-    Dict shape (rare in latest API):
-      event.markets[market_key].submarkets[*].selections[*]
-    List shape (common):
-      event.markets = [{ key: market_key, submarkets: [...]}] or selections directly.
+    One pass over the event's markets -> {lowercased market key: {label: price}},
+    for the lowercased market keys in `keys` only; other markets are never walked.
+    A key is present once any selection was seen for it, even if none resolved.
+    Supports both dict- and list-shaped 'markets':
+      event.markets[market_key]            (rare in latest API)
+      event.markets = [{ key: market_key, ...}]  (common)
     """
     markets = event.get("markets")
-    if not markets:
-        return []
-
-    # dict-shaped
     if isinstance(markets, dict):
-        m = markets.get(market_key)
-        if not m:
-            return []
+        keyed = ((str(k), m) for k, m in markets.items() if m and isinstance(m, dict))
+    elif isinstance(markets, list):
+        keyed = (
+            (str(m.get("key") or m.get("marketKey") or ""), m)
+            for m in markets if isinstance(m, dict)
+        )
+    else:
+        return {}
+    index: dict[str, dict[str, float]] = {}
+    for key, m in keyed:
+        key = key.lower()
+        if key not in keys:
+            continue
+        for sel in _iter_selections((m,)):
+            # later selections win, as in the per-market scan this replaces
+            prices = index.setdefault(key, {})
+            # str() is a no-op on the usual str payload and still covers numeric outcomes
+            label = _canon_outcome(str(sel.get("outcome", sel.get("name", ""))))
+            price = _price_from_sel(sel)
+            if label and price is not None:
+                prices[label] = float(price)
+    return index
+
+def _iter_selections(markets: Iterable[dict]) -> Iterable[dict]:
+    """
+    Selections of each market: market.submarkets[*].selections[*] (dict or list
+    of submarkets), or selections directly on the market.
+    """
+    for m in markets:
         sub = m.get("submarkets") or m.get("subMarkets")
         if isinstance(sub, dict):
-            for s in sub.values():
-                for sel in s.get("selections", []) or s.get("outcomes", []) or []:
-                    yield sel
-        elif isinstance(sub, list):
-            for s in sub:
-                for sel in s.get("selections", []) or s.get("outcomes", []) or []:
-                    yield sel
-        else:
-            # sometimes selections directly
-            for sel in m.get("selections", []) or m.get("outcomes", []) or []:
-                yield sel
-        return []
-
-    # list-shaped
-    if isinstance(markets, list):
-        for m in markets:
-            if not isinstance(m, dict):
-                continue
-            key = (m.get("key") or m.get("marketKey") or "").lower()
-            if key != market_key.lower():
-                continue
-            sub = m.get("submarkets") or m.get("subMarkets")
-            if isinstance(sub, dict):
-                for s in sub.values():
-                    for sel in s.get("selections", []) or s.get("outcomes", []) or []:
-                        yield sel
-            elif isinstance(sub, list):
-                for s in sub:
-                    for sel in s.get("selections", []) or s.get("outcomes", []) or []:
-                        yield sel
-            else:
-                # direct selections on market
-                for sel in m.get("selections", []) or m.get("outcomes", []) or []:
-                    yield sel
-    return []
+            sub = sub.values()
+        elif not isinstance(sub, list):
+            # direct selections on market
+            yield from m.get("selections", []) or m.get("outcomes", []) or []
+            continue
+        for s in sub:
+            yield from s.get("selections", []) or s.get("outcomes", []) or []
 
 def _normalize_event(
     event: dict,
+    event_index: dict[str, dict[str, float]],
     *,
     market_key: str,
     sport: str,
     league: str,
     source_url: str,
     debug: bool = False,
-) -> int:
+) -> List[dict]:
+    """Snapshot docs for one market of one event; [] when it is skipped."""
     if market_key not in MARKET_MAP:
-        return 0
+        return []
     market_uid, wanted = MARKET_MAP[market_key]
 
     event_key = str(event.get("id") or event.get("eventId") or event.get("key") or "")
@@ -237,33 +251,25 @@ def _normalize_event(
     if kickoff is None:
         if debug:
             print(f"[cloudbet] skip event with no kickoff: id={event_key}")
-        return 0
-
-    # Collect best/latest price per canonical outcome
-    prices: dict[str, float] = {}
-    found_any = False
-    for sel in _iter_selections(event, market_key):
-        found_any = True
-        raw_out = str(sel.get("outcome", sel.get("name", ""))).strip().lower()
-        label = _OUTCOME_MAP.get(raw_out)
-        price = _price_from_sel(sel)
-        if not label or price is None:
-            continue
-        prices[label] = float(price)
+        return []
 
-    if not found_any and debug:
-        # First few times, dump minimal hints to see the structure
-        mkts = event.get("markets")
-        shape = type(mkts).__name__
-        print(f"[cloudbet] no selections found for event {event_key} market={market_key} (markets shape={shape})")
+    # Latest price per canonical outcome
+    prices = event_index.get(market_key.lower())
+    if prices is None:
+        prices = {}
+        if debug:
+            # First few times, dump minimal hints to see the structure
+            mkts = event.get("markets")
+            shape = type(mkts).__name__
+            print(f"[cloudbet] no selections found for event {event_key} market={market_key} (markets shape={shape})")
 
-    if not all(lbl in prices for lbl in wanted):
+    if not _WANTED_BY_MARKET[market_key].issubset(prices):
         if debug:
             have = list(prices.keys())
             print(f"[cloudbet] incomplete market {market_key} for event {event_key}; have={have}, want={wanted}")
-        return 0
+        return []
 
-    snaps = 0
+    docs: List[dict] = []
     for lbl in wanted:
         snap = Snapshot(
             bookmaker=BOOKMAKER,
@@ -279,9 +285,8 @@ def _normalize_event(
             source_url=source_url,
             spider_version="proto/cloudbet_v2",
         )
-        insert_snapshot(snap.doc())
-        snaps += 1
-    return snaps
+        docs.append(snap.doc())
+    return docs
 
 def run_once() -> int:
     proto = _load_proto_block()
@@ -295,47 +300,55 @@ def run_once() -> int:
     debug = bool(int(os.getenv("CLOUDBET_DEBUG", "0")))
     total = 0
 
-    with _client() as c:
-        for feed in feeds:
-            sport = str(feed.get("sport") or "").strip() or "unknown"
-            comp_key = str(feed.get("competition_key") or "").strip()
-            markets: List[str] = [m for m in (feed.get("markets") or []) if m in MARKET_MAP]
-            if not comp_key or not markets:
-                if debug:
-                    print(f"[cloudbet] skip feed (missing comp_key/markets): {feed}")
-                continue
+    jobs: list[tuple[str, str, List[str], str]] = []
+    for feed in feeds:
+        sport = str(feed.get("sport") or "").strip() or "unknown"
+        comp_key = str(feed.get("competition_key") or "").strip()
+        markets: List[str] = [m for m in (feed.get("markets") or []) if m in MARKET_MAP]
+        if not comp_key or not markets:
+            if debug:
+                print(f"[cloudbet] skip feed (missing comp_key/markets): {feed}")
+            continue
 
-            league_alias = comp_key.split("-")[-1] if "-" in comp_key else comp_key
+        jobs.append((sport, comp_key, markets, f"{api_base}/competitions/{comp_key}"))
 
-            # Build params with repeated 'markets'
-            params: list[tuple[str, str]] = []
-            for m in markets:
-                params.append(("markets", m))
+    # Fetch concurrently (I/O bound; httpx.Client is thread-safe); parse + write here.
+    # map() yields in feed order and re-raises a transport error just like the serial loop did.
+    with _client() as c, ThreadPoolExecutor(
+        max_workers=max(1, min(len(jobs), _MAX_FETCH_WORKERS))
+    ) as ex:
+        # Build params with repeated 'markets'
+        responses = ex.map(lambda j: c.get(j[3], params=[("markets", m) for m in j[2]]), jobs)
+        for (sport, comp_key, markets, url), r in zip(jobs, responses):
+            league_alias = comp_key.split("-")[-1] if "-" in comp_key else comp_key
 
-            url = f"{api_base}/competitions/{comp_key}"
-            r = c.get(url, params=params)
             if r.status_code in (401, 403):
                 print(f"[cloudbet] unauthorized/forbidden for {url}; check CLOUDBET_API_KEY")
                 continue
             r.raise_for_status()
-            data = r.json()
+            data = orjson.loads(r.content)
 
             events = data.get("events")
             if not isinstance(events, list):
                 # some responses nest under 'data' or use a direct list
                 events = data.get("data") if isinstance(data.get("data"), list) else (data if isinstance(data, list) else [])
 
-            ins = 0
+            market_keys = frozenset(m.lower() for m in markets)
+            # One unordered insert_many per feed instead of a round-trip per selection
+            batch: List[dict] = []
             for ev in events:
+                event_index = _build_event_index(ev, market_keys)
                 for m in markets:
-                    ins += _normalize_event(
+                    batch.extend(_normalize_event(
                         ev,
+                        event_index,
                         market_key=m,
                         sport=sport,
                         league=league_alias,
                         source_url=str(r.request.url),
                         debug=debug,
-                    )
+                    ))
+            ins = insert_snapshots(batch)
 
             print(f"[cloudbet] feed comp={comp_key} markets={markets} -> events={len(events)}, snaps={ins}")
             total += ins
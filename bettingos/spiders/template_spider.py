@@ -2,6 +2,7 @@
 Fill parse_markets/map_selection based on your proved selectors.
 """
 from __future__ import annotations
+import msgspec
 import scrapy
 from ..models.snapshot import Snapshot
 from ..db.mongo import insert_snapshot
@@ -27,5 +28,7 @@ class BaseBookSpider(scrapy.Spider):
         raise NotImplementedError
 
     def yield_snapshot(self, **kwargs):
-        snap = Snapshot(**kwargs)
+        # Ingest boundary: validate and coerce scraped values (e.g. "1.95" -> 1.95,
+        # ISO strings -> datetime); raises msgspec.ValidationError on bad input
+        snap = msgspec.convert(kwargs, Snapshot, strict=False)
         insert_snapshot(snap.doc())
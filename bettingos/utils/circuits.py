@@ -7,16 +7,16 @@ class CircuitBreaker:
         self.fail_threshold = fail_threshold
         self.window = window_seconds
         self.cool_off = cool_off
-        self.fail_log = defaultdict(lambda: deque())  # domain -> deque[timestamps]
+        # domain -> last fail_threshold failure timestamps (ring buffer, self-pruning)
+        self.fail_log = defaultdict(lambda: deque(maxlen=self.fail_threshold))
         self.open_until = {}  # domain -> ts
 
     def record_failure(self, domain: str) -> None:
         q = self.fail_log[domain]
         now = time.time()
         q.append(now)
-        while q and now - q[0] > self.window:
-            q.popleft()
-        if len(q) >= self.fail_threshold:
+        # Trip when the oldest of the last fail_threshold failures is inside the window
+        if len(q) == self.fail_threshold and now - q[0] <= self.window:
             self.open_until[domain] = now + self.cool_off
 
     def allow(self, domain: str) -> bool:
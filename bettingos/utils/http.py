@@ -1,14 +1,20 @@
 from __future__ import annotations
-import json
+import atexit
+import gzip
+import os
+import tempfile
+import zlib
 from pathlib import Path
 from typing import Optional
 from urllib.parse import urlparse, urlsplit, urlunsplit, parse_qsl, urlencode
 import httpx
+import orjson
 from tenacity import retry, stop_after_attempt, wait_exponential
 from ..config import SETTINGS
 from .circuits import CircuitBreaker
 
-ETAG_CACHE = Path(".etag_cache.json")
+# url -> ETag, as gzip-compressed JSON (the file grows with every distinct URL)
+ETAG_CACHE = Path(".etag_cache.json.gz")
 _circuit = CircuitBreaker()
 
 _headers = {
@@ -19,14 +25,52 @@ _headers = {
     "Connection": "keep-alive",
 }
 
-if ETAG_CACHE.exists():
-    _etags = json.loads(ETAG_CACHE.read_text())
-else:
+# One pooled client for the process so repeat hosts reuse their TCP+TLS connection
+# (multiplexed over HTTP/2 where the server offers it via ALPN).
+# httpx.Client is thread-safe; spiders call fetch() from worker threads.
+_CLIENT = httpx.Client(
+    headers=_headers,
+    follow_redirects=True,
+    http2=True,
+    limits=httpx.Limits(max_keepalive_connections=32, max_connections=64),
+)
+atexit.register(_CLIENT.close)
+
+try:
+    _etags = orjson.loads(gzip.decompress(ETAG_CACHE.read_bytes()))
+except (OSError, EOFError, zlib.error, orjson.JSONDecodeError):
+    # missing, truncated or corrupt: it is only a cache, start empty
     _etags = {}
 
+# The cache file is rewritten every _SAVE_EVERY new/changed ETags and at exit,
+# not after each response.
+_SAVE_EVERY = 50
+_unsaved = 0
+
 
 def _save_cache():
-    ETAG_CACHE.write_text(json.dumps(_etags))
+    global _unsaved
+    _unsaved = 0
+    # level 1: URLs and ETags compress well even at the fastest setting
+    data = gzip.compress(orjson.dumps(_etags), compresslevel=1)
+    # Write beside the target and swap it in, so a kill mid-write never leaves
+    # a truncated cache behind
+    fd, tmp = tempfile.mkstemp(prefix=ETAG_CACHE.name + ".", dir=ETAG_CACHE.parent)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, ETAG_CACHE)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def _flush_cache():
+    if _unsaved:
+        _save_cache()
+
+
+atexit.register(_flush_cache)
 
 
 def _domain(url: str) -> str:
@@ -49,11 +93,12 @@ def fetch(url: str, timeout: float = 10.0, nocache: bool = False) -> httpx.Respo
       - add Cache-Control: no-cache,
       - append a _ts query param to bypass intermediary caches (e.g., CF).
     """
+    global _unsaved
     dom = _domain(url)
     if not _circuit.allow(dom):
         raise RuntimeError(f"Circuit open for {dom}")
 
-    headers = dict(_headers)
+    headers: dict[str, str] = {}  # per-request additions to _headers
     req_url = url
     if nocache:
         headers["Cache-Control"] = "no-cache"
@@ -66,8 +111,7 @@ def fetch(url: str, timeout: float = 10.0, nocache: bool = False) -> httpx.Respo
         req_url = _add_nocache(url)
 
     try:
-        with httpx.Client(timeout=timeout, follow_redirects=True, headers=headers) as c:
-            r = c.get(req_url)
+        r = _CLIENT.get(req_url, headers=headers, timeout=timeout)
     except Exception:
         _circuit.record_failure(dom)
         raise
@@ -83,7 +127,9 @@ def fetch(url: str, timeout: float = 10.0, nocache: bool = False) -> httpx.Respo
 
     if not nocache:
         et = r.headers.get("ETag")
-        if et:
+        if et and _etags.get(url) != et:
             _etags[url] = et
-            _save_cache()
+            _unsaved += 1
+            if _unsaved >= _SAVE_EVERY:
+                _save_cache()
     return r
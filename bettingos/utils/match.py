@@ -1,9 +1,11 @@
 from __future__ import annotations
 from dataclasses import dataclass
+from functools import lru_cache
 import unicodedata
-import yaml
 from pathlib import Path
+import numpy as np
 from rapidfuzz import process, fuzz
+from .yaml_cache import load_yaml_cached
 
 ROOT = Path(__file__).resolve().parents[2]
 TEAMS_PATH = ROOT / "aliases" / "teams.yaml"
@@ -12,12 +14,14 @@ COMPS_PATH = ROOT / "aliases" / "competitions.yaml"
 def _safe_load(path: Path, key: str) -> dict[str, list[str]]:
     if not path.exists():
         return {}
-    data = yaml.safe_load(path.read_text(encoding="utf-8")) or {}
+    data = load_yaml_cached(str(path))
     return data.get(key, {}) or {}
 
 TEAMS = _safe_load(TEAMS_PATH, "teams")
 COMPS = _safe_load(COMPS_PATH, "competitions")
 
+# Pure function of a small, heavily repeated set of team/competition names
+@lru_cache(maxsize=8192)
 def _norm(s: str) -> str:
     s = unicodedata.normalize("NFKD", s or "").encode("ascii", "ignore").decode("ascii")
     return " ".join(s.lower().strip().split())
@@ -32,6 +36,9 @@ def _expand_map(d: dict[str, list[str]]) -> dict[str, str]:
 
 TEAM_MAP = _expand_map(TEAMS)
 COMP_MAP = _expand_map(COMPS)
+# Fuzzy candidates, built once instead of per call
+_TEAM_CHOICES = tuple(TEAM_MAP)
+_COMP_CHOICES = tuple(COMP_MAP)
 
 @dataclass
 class MatchResult:
@@ -45,8 +52,7 @@ def match_team(name: str) -> MatchResult:
         return MatchResult(TEAM_MAP[key], 1.0, "alias")
     if not TEAM_MAP:
         return MatchResult(name, 0.0, "none")
-    choices = list(TEAM_MAP.keys())
-    best = process.extractOne(key, choices, scorer=fuzz.WRatio)
+    best = process.extractOne(key, _TEAM_CHOICES, scorer=fuzz.WRatio)
     if not best:
         return MatchResult(name, 0.0, "none")
     matched_key, score, _ = best
@@ -58,9 +64,30 @@ def match_competition(name: str) -> MatchResult:
         return MatchResult(COMP_MAP[key], 1.0, "alias")
     if not COMP_MAP:
         return MatchResult(name, 0.0, "none")
-    choices = list(COMP_MAP.keys())
-    best = process.extractOne(key, choices, scorer=fuzz.WRatio)
+    best = process.extractOne(key, _COMP_CHOICES, scorer=fuzz.WRatio)
     if not best:
         return MatchResult(name, 0.0, "none")
     matched_key, score, _ = best
     return MatchResult(COMP_MAP[matched_key], score / 100.0, "fuzzy")
+
+def match_teams_batch(names: list[str]) -> list[MatchResult]:
+    """
+    match_team() over many names at once: alias hits are resolved directly and
+    the rest are scored together in one multi-threaded rapidfuzz cdist pass.
+    """
+    keys = [_norm(n) for n in names]
+    out = [
+        MatchResult(TEAM_MAP[k], 1.0, "alias") if k in TEAM_MAP else MatchResult(n, 0.0, "none")
+        for n, k in zip(names, keys)
+    ]
+    pending = [i for i, k in enumerate(keys) if k not in TEAM_MAP]
+    if not pending or not _TEAM_CHOICES:
+        return out
+    scores = process.cdist(
+        [keys[i] for i in pending], _TEAM_CHOICES,
+        scorer=fuzz.WRatio, dtype=np.float64, workers=-1,
+    )
+    # argmax keeps the first of equal scores, as extractOne does
+    for i, row, j in zip(pending, scores, scores.argmax(axis=1)):
+        out[i] = MatchResult(TEAM_MAP[_TEAM_CHOICES[j]], float(row[j]) / 100.0, "fuzzy")
+    return out
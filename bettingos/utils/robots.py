@@ -1,4 +1,5 @@
 from __future__ import annotations
+import time
 from datetime import datetime, timezone
 from urllib.parse import urlparse
 from urllib import robotparser
@@ -7,6 +8,10 @@ from pymongo.database import Database
 
 COLL = "robots_cache"
 
+# Parsed robots.txt per host, so repeat checks skip the Mongo read and re-parse
+_TTL = 3600
+_RP_CACHE: dict[str, tuple[float, robotparser.RobotFileParser]] = {}
+
 def _host(url: str) -> str:
     p = urlparse(url)
     scheme = p.scheme or "https"
@@ -24,7 +29,7 @@ def fetch_and_store(db: Database, base_url: str) -> dict:
         "error": None,
     }
     try:
-        with httpx.Client(timeout=10) as c:
+        with httpx.Client(timeout=10, http2=True) as c:
             r = c.get(robots_url)
             doc["status"] = r.status_code
             if r.is_success:
@@ -32,10 +37,14 @@ def fetch_and_store(db: Database, base_url: str) -> dict:
     except Exception as e:
         doc["error"] = str(e)
     db.get_collection(COLL).replace_one({"host": doc["host"]}, doc, upsert=True)
+    _RP_CACHE.pop(doc["host"], None)  # re-parse the fresh copy on next check
     return doc
 
-def is_allowed(db: Database, user_agent: str, url: str) -> bool:
+def _parser(db: Database, url: str) -> robotparser.RobotFileParser:
     host = urlparse(url).netloc
+    hit = _RP_CACHE.get(host)
+    if hit and time.monotonic() - hit[0] < _TTL:
+        return hit[1]
     rp = robotparser.RobotFileParser()
     cached = db.get_collection(COLL).find_one({"host": host})
     if cached and cached.get("content"):
@@ -44,4 +53,20 @@ def is_allowed(db: Database, user_agent: str, url: str) -> bool:
         origin = _host(url)
         rp.set_url(f"{origin}/robots.txt")
         rp.read()
-    return rp.can_fetch(user_agent, url)
+    _RP_CACHE[host] = (time.monotonic(), rp)
+    return rp
+
+def is_allowed(db: Database, user_agent: str, url: str) -> bool:
+    return _parser(db, url).can_fetch(user_agent, url)
+
+def can_fetch_batch(db: Database, user_agent: str, urls: list[str]) -> list[bool]:
+    """is_allowed() for many URLs, resolving each host's parser once."""
+    by_host: dict[str, robotparser.RobotFileParser] = {}
+    out = []
+    for url in urls:
+        host = urlparse(url).netloc
+        rp = by_host.get(host)
+        if rp is None:
+            rp = by_host[host] = _parser(db, url)
+        out.append(rp.can_fetch(user_agent, url))
+    return out
@@ -1,4 +1,13 @@
+from __future__ import annotations
 from datetime import datetime, timezone
 
 def now_utc():
     return datetime.now(timezone.utc)
+
+def from_epoch(ts) -> datetime | None:
+    """Feed epoch timestamp (seconds or milliseconds) -> aware UTC datetime; None if absent."""
+    if isinstance(ts, (int, float)) and ts > 10_000_000_000:
+        ts /= 1000.0
+    if isinstance(ts, (int, float)) and ts > 0:
+        return datetime.fromtimestamp(ts, tz=timezone.utc)
+    return None
@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+import os
+from functools import lru_cache
+
+import yaml
+
+# libyaml's C loader is far faster than the pure-Python one; not every build ships it
+_Loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+@lru_cache(maxsize=8)
+def _load(path: str, mtime_ns: int) -> dict:
+    with open(path, "rb") as f:
+        return yaml.load(f, Loader=_Loader) or {}
+
+def load_yaml_cached(path: str) -> dict:
+    """
+    Parse a YAML file once per (path, mtime); an edit on disk is picked up on
+    the next call. The dict is shared between callers, so treat it as read-only.
+    """
+    return _load(path, os.stat(path).st_mtime_ns)
+
+
+@lru_cache(maxsize=4)
+def _books_by_key(path: str, mtime_ns: int) -> dict[str, dict]:
+    by_key: dict[str, dict] = {}
+    for b in _load(path, mtime_ns).get("books", []):
+        if b.get("key"):
+            # first entry wins, matching the next(...) scans this replaces
+            by_key.setdefault(str(b["key"]), b)
+    return by_key
+
+def load_books_by_key(path: str = "books.yaml") -> dict[str, dict]:
+    """The "books" list of a books.yaml indexed by key; cached the same way."""
+    return _books_by_key(path, os.stat(path).st_mtime_ns)
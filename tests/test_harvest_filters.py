@@ -0,0 +1,38 @@
+from bettingos.fetchers.harvest import _compile_union, _match_any
+from bettingos.harvest.playwright_harvester import _compile_filters, _matches
+
+# Each entry compiles on its own, but not once joined into one alternation
+INLINE_FLAG = ["(?i)/ODDS/", r"ultraplay\.", "/api/"]
+DUP_GROUP = ["(?P<a>/odds/)", "(?P<a>/lines/)"]
+
+
+def test_filters_accept_inline_flags():
+    f = _compile_filters(INLINE_FLAG)
+    assert _matches("https://x.test/odds/1", f)
+    assert _matches("https://ultraplay.test/e", f)
+    assert _matches("https://x.test/api/e", f)
+    assert not _matches("https://x.test/home", f)
+
+
+def test_filters_accept_reused_group_names():
+    f = _compile_filters(DUP_GROUP)
+    assert _matches("https://x.test/odds/1", f)
+    assert _matches("https://x.test/lines/1", f)
+    assert not _matches("https://x.test/home", f)
+
+
+def test_filters_join_compatible_regexes():
+    subs, regs = _compile_filters([r"/api/v\d+", r"odds\.json", "plain"])
+    assert subs == ("plain",) and len(regs) == 1
+    assert _matches("https://x.test/api/v2/e", (subs, regs))
+
+
+def test_empty_filters_keep_everything():
+    assert _matches("https://x.test/anything", _compile_filters([]))
+
+
+def test_union_falls_back_per_pattern():
+    for pats in (INLINE_FLAG, DUP_GROUP):
+        rx = _compile_union(pats)
+        assert _match_any("https://x.test/odds/1", rx)
+        assert not _match_any("https://x.test/home", rx)